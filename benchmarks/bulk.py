@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.load import login, make_client
+
+
+def payload(count: int):
+    return [
+        {
+            'title': f'imported {i}',
+            'description': 'seeded by benchmarks.bulk',
+            'state': 'todo',
+        }
+        for i in range(count)
+    ]
+
+
+async def single(client, headers, rows: int, concurrency: int):
+    todos = iter(payload(rows))
+
+    async def worker():
+        for todo in todos:
+            response = await client.post('/todos/', json=todo, headers=headers)
+            response.raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def bulk(client, headers, rows: int, batch: int):
+    todos = payload(rows)
+    for start in range(0, rows, batch):
+        response = await client.post(
+            '/todos/bulk', json=todos[start : start + batch], headers=headers
+        )
+        response.raise_for_status()
+
+
+async def main(args):
+    async with make_client(args.url, args.concurrency) as client:
+        token = await login(client, args.email, args.password)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        start = time.perf_counter()
+        await single(client, headers, args.rows, args.concurrency)
+        single_rate = args.rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await bulk(client, headers, args.rows, args.batch)
+        bulk_rate = args.rows / (time.perf_counter() - start)
+
+    print(
+        f'POST /todos/     c={args.concurrency:<4} {single_rate:>9.1f} rows/s'
+    )
+    print(f'POST /todos/bulk n={args.batch:<4} {bulk_rate:>9.1f} rows/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Rows/sec of single-item vs bulk todo creation.'
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--rows', type=int, default=5_000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.scenarios import asgi_client, seed
+from fast_zero.app import app
+
+USERS = 10
+TODOS = 1_000
+
+
+@pytest.fixture(scope='session')
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def engine(loop, tmp_path_factory):
+    url = os.environ.get('BENCH_DATABASE_URL')
+    if not url:
+        path = tmp_path_factory.mktemp('benchmark') / 'benchmark.db'
+        url = f'sqlite+aiosqlite:///{path}'
+
+    engine = create_async_engine(url)
+    yield engine
+    loop.run_until_complete(engine.dispose())
+
+
+@pytest.fixture(scope='session')
+def seeded(loop, engine):
+    return loop.run_until_complete(seed(engine, users=USERS, todos=TODOS))
+
+
+@pytest.fixture(scope='session')
+def call(loop, engine, seeded):
+    client = asgi_client(engine)
+
+    def call(method, path, **kwargs):
+        response = loop.run_until_complete(
+            client.request(method, path, **kwargs)
+        )
+        if response.is_error:
+            response.raise_for_status()
+        return response
+
+    yield call
+
+    loop.run_until_complete(client.aclose())
+    app.dependency_overrides.clear()
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class LoadResult:
+    duration: float
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def requests(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def rps(self):
+        return len(self.latencies) / self.duration
+
+    def percentile(self, value: int):
+        if len(self.latencies) < 2:  # noqa: PLR2004
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100)[value - 1]
+
+    def summary(self, name: str):
+        return (
+            f'{name:<32} {self.requests:>8} req  {self.rps:>9.1f} rps  '
+            f'p50 {self.percentile(50) * 1000:>8.1f} ms  '
+            f'p95 {self.percentile(95) * 1000:>8.1f} ms  '
+            f'p99 {self.percentile(99) * 1000:>8.1f} ms  '
+            f'errors {self.errors}'
+        )
+
+
+def cpu_seconds(pids: list[int]):
+    """User + system CPU time of `pids` so far, from /proc (Linux only)."""
+    ticks = 0
+    for pid in pids:
+        with open(f'/proc/{pid}/stat', encoding='ascii') as stat:
+            # Fields after the command name, which may contain spaces.
+            fields = stat.read().rpartition(')')[2].split()
+        ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str):
+    response = await client.post(
+        '/auth/token/', data={'username': email, 'password': password}
+    )
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+async def run(  # noqa: PLR0913, PLR0917
+    client: httpx.AsyncClient,
+    method: str,
+    path: str,
+    concurrency: int,
+    duration: float,
+    **request_kwargs,
+):
+    """Keep `concurrency` requests in flight against `path` for `duration`."""
+    result = LoadResult(duration=duration)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **request_kwargs)
+            except httpx.HTTPError:
+                result.errors += 1
+                continue
+            if response.is_error:
+                result.errors += 1
+            else:
+                result.latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result
+
+
+def make_client(base_url: str, concurrency: int, **kwargs):
+    return httpx.AsyncClient(
+        base_url=base_url,
+        limits=httpx.Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency,
+        ),
+        timeout=httpx.Timeout(60.0),
+        **kwargs,
+    )
+
+
+async def main(args):
+    async with make_client(args.url, args.concurrency) as client:
+        headers = {}
+        if args.email:
+            token = await login(client, args.email, args.password)
+            headers['Authorization'] = f'Bearer {token}'
+
+        # warm up the connections before measuring
+        await run(
+            client, 'GET', args.path, args.concurrency, 1.0, headers=headers
+        )
+        cpu_start = cpu_seconds(args.server_pid)
+        result = await run(
+            client,
+            'GET',
+            args.path,
+            args.concurrency,
+            args.duration,
+            headers=headers,
+        )
+        cpu = cpu_seconds(args.server_pid) - cpu_start
+
+    summary = result.summary(f'GET {args.path} c={args.concurrency}')
+    if args.server_pid and result.requests:
+        summary += f'  server cpu {cpu / result.requests * 1000:.2f} ms/req'
+    print(summary)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Closed-loop HTTP load generator for fast_zero.'
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--path', default='/todos/')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--email')
+    parser.add_argument('--password')
+    parser.add_argument(
+        '--server-pid',
+        type=int,
+        action='append',
+        default=[],
+        help='report the CPU time these processes spend per request',
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+
+from benchmarks.load import login, make_client, run
+
+
+async def main(args):
+    concurrency = args.login_concurrency + args.todo_concurrency
+    async with make_client(args.url, concurrency) as client:
+        token = await login(client, args.email, args.password)
+        headers = {'Authorization': f'Bearer {token}'}
+        credentials = {'username': args.email, 'password': args.password}
+
+        quiet = await run(
+            client,
+            'GET',
+            '/todos/',
+            args.todo_concurrency,
+            args.duration,
+            headers=headers,
+        )
+        logins, todos = await asyncio.gather(
+            run(
+                client,
+                'POST',
+                '/auth/token/',
+                args.login_concurrency,
+                args.duration,
+                data=credentials,
+            ),
+            run(
+                client,
+                'GET',
+                '/todos/',
+                args.todo_concurrency,
+                args.duration,
+                headers=headers,
+            ),
+        )
+
+    print(quiet.summary('GET /todos/ (no logins)'))
+    print(todos.summary('GET /todos/ (during storm)'))
+    print(logins.summary('POST /auth/token/ (storm)'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Todo latency while a login storm runs Argon2.'
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--login-concurrency', type=int, default=50)
+    parser.add_argument('--todo-concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
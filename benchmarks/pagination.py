@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.load import login, make_client
+from fast_zero.database import engine
+from fast_zero.models import Todo, User
+from fast_zero.pagination import SORT_KEYS, encode_cursor
+from fast_zero.security import get_password_hash
+
+EMAIL = 'pagination-bench@example.com'
+PASSWORD = 'pagination-bench'
+
+
+async def seed(count: int):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = await session.scalar(select(User).where(User.email == EMAIL))
+        if user is None:
+            user = User(
+                username='pagination-bench',
+                email=EMAIL,
+                password=get_password_hash(PASSWORD),
+            )
+            session.add(user)
+            await session.commit()
+
+        await session.execute(delete(Todo).where(Todo.user_id == user.id))
+        await session.execute(
+            text(
+                'INSERT INTO todos '
+                '(title, description, state, user_id, created_at) '
+                "SELECT 'todo ' || n, 'seeded by benchmarks.pagination', "
+                "'todo', :user_id, now() - n * interval '1 second' "
+                'FROM generate_series(1, :count) AS n'
+            ),
+            {'user_id': user.id, 'count': count},
+        )
+        await session.commit()
+        await session.execute(text('ANALYZE todos'))
+        # Statistics are transactional; a rollback would discard them.
+        await session.commit()
+        return user.id
+
+
+async def cursor_for_page(user_id: int, page: int, args):
+    if page == 1:
+        return None
+
+    columns = [getattr(Todo, key) for key in SORT_KEYS[args.order_by]]
+    async with AsyncSession(engine) as session:
+        todo = await session.scalar(
+            select(Todo)
+            .where(Todo.user_id == user_id)
+            .order_by(*columns)
+            .offset((page - 1) * args.limit - 1)
+            .limit(1)
+        )
+        return encode_cursor(args.order_by, todo)
+
+
+async def timed(client, params, headers, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get('/todos/', params=params, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+async def main(args):
+    if not args.skip_seed:
+        user_id = await seed(args.todos)
+    else:
+        async with AsyncSession(engine) as session:
+            user_id = await session.scalar(
+                select(User.id).where(User.email == EMAIL)
+            )
+
+    async with make_client(args.url, 1) as client:
+        token = await login(client, EMAIL, PASSWORD)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        print(f'{"page":>8} {"offset (ms)":>12} {"cursor (ms)":>12}')
+        for page in args.pages:
+            keyset = {'limit': args.limit, 'order_by': args.order_by}
+            offset = {**keyset, 'offset': (page - 1) * args.limit}
+            cursor = await cursor_for_page(user_id, page, args)
+            if cursor:
+                keyset['cursor'] = cursor
+
+            offset_ms = await timed(client, offset, headers, args.repeat)
+            keyset_ms = await timed(client, keyset, headers, args.repeat)
+            print(f'{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Page latency of offset vs cursor pagination.'
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument(
+        '--pages', type=int, nargs='+', default=[1, 10, 100, 1_000, 10_000]
+    )
+    parser.add_argument('--order-by', choices=sorted(SORT_KEYS), default='id')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--skip-seed', action='store_true')
+    asyncio.run(main(parser.parse_args()))
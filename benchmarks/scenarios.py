@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from fast_zero.app import app
+from fast_zero.cache import user_cache
+from fast_zero.database import get_session
+from fast_zero.models import Todo, table_registry
+from fast_zero.ratelimit import limit_client_ip, limit_login_username
+from fast_zero.security import create_access_token, get_password_hash
+from tests.conftest import TodoFactory, UserFactory
+
+PASSWORD = 'benchmark'
+
+
+@dataclass
+class Seeded:
+    user_id: int
+    email: str
+    todo_id: int
+    token: str
+
+    @property
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+async def seed(engine, users: int, todos: int):
+    """Recreate the schema and fill it through the test factories.
+
+    Every user gets `todos` rows; the first one is used by the scenarios.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
+        await conn.run_sync(table_registry.metadata.create_all)
+    user_cache.backend.clear()
+
+    password = get_password_hash(PASSWORD)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        db_users = UserFactory.create_batch(users, password=password)
+        session.add_all(db_users)
+        await session.commit()
+
+        for user in db_users:
+            session.add_all(TodoFactory.create_batch(todos, user_id=user.id))
+        await session.commit()
+
+        user = db_users[0]
+        todo_id = await session.scalar(
+            select(Todo.id).where(Todo.user_id == user.id).limit(1)
+        )
+
+    return Seeded(
+        user_id=user.id,
+        email=user.email,
+        todo_id=todo_id,
+        token=create_access_token(data={'sub': user.email}),
+    )
+
+
+def asgi_client(engine, **kwargs):
+    """An httpx client that calls the app in-process on `engine`.
+
+    Login rate limits are lifted, since every request comes from the same
+    client and the same user.
+    """
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_session_override():
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    for limit in (limit_client_ip, limit_login_username):
+        app.dependency_overrides[limit] = lambda: None
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url='http://benchmark',
+        **kwargs,
+    )
+
+
+TODO = {'title': 'benchmark', 'description': 'created', 'state': 'todo'}
+
+# name -> (method, path, request kwargs) for a seeded database. Only
+# requests that can be repeated forever without failing are listed;
+# creating users needs unique names and is benchmarked on its own.
+SCENARIOS = {
+    'read_root': lambda s: ('GET', '/', {}),
+    'login_for_access_token': lambda s: (
+        'POST',
+        '/auth/token/',
+        {'data': {'username': s.email, 'password': PASSWORD}},
+    ),
+    'refresh_access_token': lambda s: (
+        'POST',
+        '/auth/refresh_token/',
+        {'headers': s.headers},
+    ),
+    'read_users': lambda s: ('GET', '/users/', {}),
+    'get_user': lambda s: ('GET', f'/users/{s.user_id}', {}),
+    'create_todo': lambda s: (
+        'POST',
+        '/todos/',
+        {'headers': s.headers, 'json': TODO},
+    ),
+    'read_todos': lambda s: ('GET', '/todos/', {'headers': s.headers}),
+    'read_todos_search': lambda s: (
+        'GET',
+        '/todos/',
+        {'headers': s.headers, 'params': {'q': 'benchmark'}},
+    ),
+    'update_todo': lambda s: (
+        'PATCH',
+        f'/todos/{s.todo_id}',
+        {'headers': s.headers, 'json': {'state': 'doing'}},
+    ),
+    'read_todo_stats': lambda s: (
+        'GET',
+        '/todos/stats',
+        {'headers': s.headers},
+    ),
+    'export_todos': lambda s: (
+        'GET',
+        '/todos/export',
+        {'headers': s.headers},
+    ),
+}
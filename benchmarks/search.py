@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.database import engine
+from fast_zero.models import Todo, User
+from fast_zero.routes.todos import search_todos
+
+EMAIL = 'search-bench@example.com'
+WORDS = [
+    'buy', 'call', 'fix', 'write', 'review', 'deploy', 'plan', 'clean',
+    'milk', 'report', 'server', 'garden', 'invoice', 'meeting', 'car',
+    'doctor', 'release', 'backup', 'budget', 'trip',
+]  # fmt: skip
+
+
+async def seed(session: AsyncSession, count: int):
+    user = await session.scalar(select(User).where(User.email == EMAIL))
+    if user is None:
+        user = User(username='search-bench', email=EMAIL, password='!')
+        session.add(user)
+        await session.commit()
+
+    await session.execute(delete(Todo).where(Todo.user_id == user.id))
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, state, user_id) '
+            "SELECT w[1 + n % 20] || ' ' || w[1 + (n / 20) % 20], "
+            "'note ' || md5(n::text), 'todo', :user_id "
+            'FROM generate_series(1, :count) AS n, '
+            'CAST(:words AS text[]) AS w'
+        ),
+        {'user_id': user.id, 'count': count, 'words': WORDS},
+    )
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+    # Statistics are transactional; a rollback would discard them.
+    await session.commit()
+    return user.id
+
+
+async def timed(session: AsyncSession, query, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        (await session.scalars(query)).all()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+async def main(args):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        if args.skip_seed:
+            user_id = await session.scalar(
+                select(User.id).where(User.email == EMAIL)
+            )
+        else:
+            user_id = await seed(session, args.todos)
+
+        base = (
+            select(Todo)
+            .where(Todo.user_id == user_id)
+            .order_by(Todo.id)
+            .limit(args.limit)
+        )
+        print(f'{"term":>24} {"LIKE (ms)":>12} {"q (ms)":>12}')
+        for term in args.terms:
+            like = await timed(
+                session, base.where(Todo.title.contains(term)), args.repeat
+            )
+            fts = await timed(
+                session,
+                base.where(search_todos(term, 'postgresql')),
+                args.repeat,
+            )
+            print(f'{term:>24} {like:>12.2f} {fts:>12.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='LIKE filter vs full-text `q` search on todos.'
+    )
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument(
+        '--terms', nargs='+', default=['garden trip', 'invoice', 'missing']
+    )
+    parser.add_argument('--skip-seed', action='store_true')
+    asyncio.run(main(parser.parse_args()))
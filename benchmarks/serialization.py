@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.database import engine
+from fast_zero.models import Todo, User
+from fast_zero.responses import page_response, select_fields
+from fast_zero.schemas import TodoListPulicSchema, TodoPulicSchema
+
+EMAIL = 'serialization-bench@example.com'
+
+
+async def seed(session: AsyncSession, count: int):
+    user = await session.scalar(select(User).where(User.email == EMAIL))
+    if user is None:
+        user = User(username='serialization-bench', email=EMAIL, password='!')
+        session.add(user)
+        await session.commit()
+
+    await session.execute(delete(Todo).where(Todo.user_id == user.id))
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, state, user_id) '
+            "SELECT 'todo ' || n, 'note ' || md5(n::text), 'todo', :user_id "
+            'FROM generate_series(1, :count) AS n'
+        ),
+        {'user_id': user.id, 'count': count},
+    )
+    await session.commit()
+    return user.id
+
+
+async def orm_pydantic(session: AsyncSession, user_id: int):
+    """What `GET /todos/` did before: ORM objects + response_model."""
+    field = create_response_field('response', TodoListPulicSchema)
+    todos = (
+        await session.scalars(select(Todo).where(Todo.user_id == user_id))
+    ).all()
+    content = await serialize_response(
+        field=field, response_content={'todos': todos, 'next_cursor': None}
+    )
+    return JSONResponse(content).body
+
+
+async def rows_orjson(session: AsyncSession, user_id: int):
+    todos = (
+        await session.execute(
+            select_fields(Todo, TodoPulicSchema).where(Todo.user_id == user_id)
+        )
+    ).all()
+    return page_response('todos', todos, None).body
+
+
+async def timed(func, session: AsyncSession, user_id: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        # New identity map each round so the ORM path pays full
+        # materialization every time, as it does per request.
+        session.expunge_all()
+        start = time.perf_counter()
+        await func(session, user_id)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+async def main(args):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user_id = await seed(session, args.rows)
+
+        before = await timed(orm_pydantic, session, user_id, args.repeat)
+        after = await timed(rows_orjson, session, user_id, args.repeat)
+
+    for name, seconds in (
+        ('ORM + Pydantic + json', before),
+        ('rows + orjson', after),
+    ):
+        per_row = seconds / args.rows * 1_000_000
+        print(f'{name:<22} {seconds * 1000:>9.2f} ms {per_row:>7.2f} us/row')
+    print(f'speedup {before / after:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Per-row cost of building a todo list response.'
+    )
+    parser.add_argument('--rows', type=int, default=1_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.load import run
+from benchmarks.scenarios import SCENARIOS, asgi_client, seed
+
+
+def default_db_url():
+    path = Path(tempfile.gettempdir()) / 'fast_zero-benchmark.db'
+    return f'sqlite+aiosqlite:///{path}'
+
+
+def compare(results: dict, baseline: dict, max_regression: float):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        change = (result['rps'] - before['rps']) / before['rps']
+        print(
+            f'{name:<32} rps {before["rps"]:>9.1f} -> {result["rps"]:>9.1f} '
+            f'({change:+.1%})  p95 {before["p95"] * 1000:>8.1f} -> '
+            f'{result["p95"] * 1000:>8.1f} ms'
+        )
+        if change < -max_regression:
+            regressions.append(name)
+    return regressions
+
+
+async def main(args):
+    engine = create_async_engine(args.db_url)
+    seeded = await seed(engine, users=args.users, todos=args.todos)
+
+    results = {}
+    async with asgi_client(engine) as client:
+        for name in args.only or SCENARIOS:
+            method, path, kwargs = SCENARIOS[name](seeded)
+            await run(client, method, path, args.concurrency, 0.5, **kwargs)
+            result = await run(
+                client, method, path, args.concurrency, args.duration, **kwargs
+            )
+            print(result.summary(name))
+            results[name] = {
+                'rps': result.rps,
+                'p50': result.percentile(50),
+                'p95': result.percentile(95),
+                'p99': result.percentile(99),
+                'errors': result.errors,
+            }
+    await engine.dispose()
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f'RPS regressed beyond {args.max_regression:.0%}:')
+            print('\n'.join(f'  {name}' for name in regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='In-process load test of every route on seeded data.'
+    )
+    parser.add_argument(
+        '--db-url',
+        default=os.environ.get('BENCH_DATABASE_URL') or default_db_url(),
+    )
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--todos', type=int, default=1_000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--only', nargs='+', choices=SCENARIOS)
+    parser.add_argument('--save', type=Path)
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument('--max-regression', type=float, default=0.15)
+    sys.exit(asyncio.run(main(parser.parse_args())))
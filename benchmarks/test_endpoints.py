@@ -0,0 +1,80 @@
+import itertools
+
+import pytest
+
+from benchmarks.scenarios import PASSWORD, SCENARIOS
+from fast_zero import sync
+
+
+@pytest.mark.parametrize('name', SCENARIOS)
+def test_endpoint(benchmark, call, seeded, name):
+    method, path, kwargs = SCENARIOS[name](seeded)
+
+    benchmark(call, method, path, **kwargs)
+
+
+def test_create_user(benchmark, call):
+    numbers = itertools.count()
+
+    def create_user():
+        number = next(numbers)
+        call(
+            'POST',
+            '/users/',
+            json={
+                'username': f'benchmark{number}',
+                'email': f'benchmark{number}@example.com',
+                'password': PASSWORD,
+            },
+        )
+
+    benchmark(create_user)
+
+
+def test_rotate_access_token(benchmark, call, seeded):
+    # Each refresh token is single-use, so every call spends the last one.
+    response = call(
+        'POST',
+        '/auth/token/',
+        data={'username': seeded.email, 'password': PASSWORD},
+    )
+    refresh_token = response.json()['refresh_token']
+
+    def rotate():
+        nonlocal refresh_token
+        response = call(
+            'POST',
+            '/auth/token/refresh/',
+            json={'refresh_token': refresh_token},
+        )
+        refresh_token = response.json()['refresh_token']
+
+    benchmark(rotate)
+
+
+def test_read_todos_not_modified(benchmark, call, seeded):
+    etag = call('GET', '/todos/', headers=seeded.headers).headers['etag']
+
+    benchmark(
+        call,
+        'GET',
+        '/todos/',
+        headers={**seeded.headers, 'If-None-Match': etag},
+    )
+
+
+def test_read_todo_changes_caught_up(benchmark, call, seeded, monkeypatch):
+    # Without the overlap window, a client that just synced has nothing
+    # to fetch: this is the cost of a startup resync of an idle board.
+    monkeypatch.setattr(sync.settings, 'SYNC_OVERLAP_SECONDS', 0)
+    params = {'limit': 1000}
+    data = {'has_more': True}
+    while data['has_more']:
+        data = call(
+            'GET', '/todos/changes', headers=seeded.headers, params=params
+        ).json()
+        params['since'] = data['next_token']
+
+    benchmark(
+        call, 'GET', '/todos/changes', headers=seeded.headers, params=params
+    )
@@ -0,0 +1,36 @@
+import argparse
+import time
+
+from fast_zero.cache import token_cache
+from fast_zero.security import create_access_token, decode_access_token
+
+
+def cpu_per_call(token: str, iterations: int):
+    start = time.process_time()
+    for _ in range(iterations):
+        decode_access_token(token)
+    return (time.process_time() - start) / iterations
+
+
+def main(args):
+    token = create_access_token({'sub': 'benchmark@example.com'})
+    maxsize = token_cache.maxsize or 10_000
+
+    token_cache.maxsize = 0
+    before = cpu_per_call(token, args.iterations)
+
+    token_cache.maxsize = maxsize
+    token_cache.clear()
+    after = cpu_per_call(token, args.iterations)
+
+    print(f'jwt.decode every request {before * 1_000_000:>8.2f} us CPU')
+    print(f'verified-token cache     {after * 1_000_000:>8.2f} us CPU')
+    print(f'speedup {before / after:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Per-request CPU spent decoding the access token.'
+    )
+    parser.add_argument('--iterations', type=int, default=100_000)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+import httpx
+
+from benchmarks.load import login, make_client, run
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        try:
+            response = await client.get('/')
+            if response.is_success:
+                return
+        except httpx.HTTPError:
+            pass
+        if asyncio.get_running_loop().time() > deadline:
+            raise RuntimeError('server did not start')
+        await asyncio.sleep(0.2)
+
+
+async def measure(args, workers: int):
+    env = {
+        **os.environ,
+        'SERVER_HOST': '127.0.0.1',
+        'SERVER_PORT': str(args.port),
+        'SERVER_WORKERS': str(workers),
+    }
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'fast_zero.server'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f'http://127.0.0.1:{args.port}'
+        async with make_client(url, args.concurrency) as client:
+            await wait_until_ready(client)
+            token = await login(client, args.email, args.password)
+            headers = {'Authorization': f'Bearer {token}'}
+
+            await run(
+                client,
+                'GET',
+                args.path,
+                args.concurrency,
+                1.0,
+                headers=headers,
+            )
+            return await run(
+                client,
+                'GET',
+                args.path,
+                args.concurrency,
+                args.duration,
+                headers=headers,
+            )
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+
+async def main(args):
+    for workers in args.workers:
+        result = await measure(args, workers)
+        print(result.summary(f'GET {args.path} workers={workers}'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Throughput of fast_zero.server versus worker count.'
+    )
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', default='/todos/')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    asyncio.run(main(parser.parse_args()))
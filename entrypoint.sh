@@ -2,4 +2,4 @@
 
 poetry run alembic upgrade head
 
-poetry run uvicorn --host 0.0.0.0 --port 8000 fast_zero.app:app
\ No newline at end of file
+exec poetry run python -m fast_zero.server
\ No newline at end of file
@@ -1,14 +1,81 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
+from fastapi import FastAPI, Response
+
+from fast_zero import metrics
+from fast_zero.cache import token_cache, user_cache
+from fast_zero.database import engine, pool_stats
+from fast_zero.events import todo_events
+from fast_zero.purge import run_purge
+from fast_zero.ratelimit import login_verifications, rate_limiter
 from fast_zero.routes import auth, todos, users
+from fast_zero.security import key_set, password_hasher
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if settings.EVENTS_FANOUT:
+        conninfo = engine.url.set(drivername='postgresql')
+        tasks.append(
+            todo_events.listen(conninfo.render_as_string(hide_password=False))
+        )
+    if settings.PURGE_WORKER:
+        tasks.append(
+            run_purge(
+                engine,
+                settings.PURGE_BATCH_SIZE,
+                settings.PURGE_ROWS_PER_SECOND,
+                settings.PURGE_IDLE_SECONDS,
+            )
+        )
+    tasks = [asyncio.create_task(task) for task in tasks]
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    password_hasher.shutdown()
+    await engine.dispose()
+    metrics.mark_process_dead()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(todos.router)
 
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.include_router(metrics.router)
+
 
 @app.get('/')
-def read_root():
+async def read_root():
     return {'message': 'Olar mundo!'}
+
+
+@app.get('/stats/')
+async def read_stats():
+    return {
+        'user_cache': user_cache.stats(),
+        'token_cache': token_cache.stats(),
+        'database_pool': pool_stats(),
+        'rate_limit': rate_limiter.stats(),
+        'login_verifications': login_verifications.stats(),
+    }
+
+
+@app.get('/.well-known/jwks.json', include_in_schema=False)
+async def read_jwks():
+    return Response(
+        key_set.jwks,
+        media_type='application/json',
+        headers={'Cache-Control': f'public, max-age={settings.JWKS_MAX_AGE}'},
+    )
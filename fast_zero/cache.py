@@ -0,0 +1,248 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+import sqlalchemy
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from fast_zero.models import TokenRevocation, User
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+# `Session.info` key of the revocations waiting for the session to commit.
+PENDING_REVOCATIONS = 'token_revocations'
+
+
+class CacheBackend(Protocol):
+    """Storage used by `UserCache`.
+
+    The in-process `MemoryBackend` is the default. A shared backend
+    (Redis, memcached...) only has to implement these three coroutines
+    and be assigned to `user_cache.backend` at startup.
+    """
+
+    async def get(self, key: str) -> dict[str, Any] | None: ...
+
+    async def set(self, key: str, value: dict[str, Any], ttl: int): ...
+
+    async def delete(self, key: str): ...
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, dict[str, Any]]] = (
+            OrderedDict()
+        )
+
+    def __len__(self):
+        return len(self._data)
+
+    async def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any], ttl: int):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class UserCache:
+    """Cache of authenticated principals keyed by the token subject.
+
+    Only the public columns are stored; the password hash stays in the
+    database and is loaded on demand if a route ever reads it.
+    """
+
+    fields = (
+        'id',
+        'username',
+        'email',
+        'created_at',
+        'updated_at',
+        'token_version',
+    )
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    async def get(self, session: AsyncSession, subject: str):
+        if not self.enabled:
+            return None
+
+        data = await self.backend.get(subject)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        user = User.__mapper__.class_manager.new_instance()
+        for key, value in data.items():
+            setattr(user, key, value)
+        make_transient_to_detached(user)
+
+        return await session.merge(user, load=False)
+
+    async def set(self, subject: str, user: User):
+        if self.enabled:
+            data = {key: getattr(user, key) for key in self.fields}
+            await self.backend.set(subject, data, self.ttl)
+
+    async def invalidate(self, subject: str):
+        await self.backend.delete(subject)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class TokenDenylist:
+    """In-process copy of `token_revocations`, reloaded every
+    `refresh_interval` seconds.
+
+    The table only has rows for users who changed their credentials or
+    deleted their account within the access token lifetime (the purge
+    removes older ones), so a full reload is cheap. Revocations made by
+    this process apply as soon as they are committed; the ones made by
+    other workers apply after the next reload.
+    """
+
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self.clear()
+
+    def clear(self):
+        self.versions: dict[int, int] = {}
+        self.loaded_at = float('-inf')
+
+    async def refresh(self, session: AsyncSession):
+        # Mark as loaded first so concurrent requests don't all reload.
+        self.loaded_at = time.monotonic()
+        rows = await session.execute(
+            select(TokenRevocation.user_id, TokenRevocation.version)
+        )
+        self.versions = dict(rows.all())
+
+    async def is_revoked(self, session: AsyncSession, user_id, version):
+        if time.monotonic() - self.loaded_at >= self.refresh_interval:
+            await self.refresh(session)
+        return version < self.versions.get(user_id, 0)
+
+    async def revoke(self, session: AsyncSession, user_id: int, version):
+        """Reject tokens of `user_id` older than `version`.
+
+        Added to `session`; takes effect once committed.
+        """
+        await session.merge(TokenRevocation(user_id=user_id, version=version))
+        pending = session.info.setdefault(PENDING_REVOCATIONS, [])
+        pending.append((self, user_id, version))
+
+
+@sqlalchemy.event.listens_for(Session, 'after_commit')
+def _apply_pending_revocations(session: Session):
+    for denylist, user_id, version in session.info.pop(
+        PENDING_REVOCATIONS, ()
+    ):
+        denylist.versions[user_id] = version
+
+
+@sqlalchemy.event.listens_for(Session, 'after_rollback')
+def _drop_pending_revocations(session: Session):
+    session.info.pop(PENDING_REVOCATIONS, None)
+
+
+class TokenCache:
+    """Claims of access tokens whose signature was already verified.
+
+    Keyed by the SHA-256 digest of the token, so raw tokens are never
+    held in memory. Entries are dropped once the token's `exp` passes,
+    and the least recently used ones are evicted beyond `maxsize`.
+    Only used from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[bytes, dict[str, Any]] = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, token: str):
+        if not self.enabled:
+            return None
+
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self._data.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+
+        if payload['exp'] <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return dict(payload)
+
+    def set(self, token: str, payload: dict[str, Any]):
+        if not self.enabled or 'exp' not in payload:
+            return
+
+        key = hashlib.sha256(token.encode()).digest()
+        self._data[key] = dict(payload)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+
+user_cache = UserCache(
+    MemoryBackend(maxsize=settings.USER_CACHE_MAXSIZE),
+    ttl=settings.USER_CACHE_TTL,
+)
+
+token_denylist = TokenDenylist(
+    refresh_interval=settings.TOKEN_DENYLIST_REFRESH_SECONDS
+)
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_MAXSIZE)
@@ -0,0 +1,107 @@
+"""Pick Argon2 parameters that hit a target verify latency on this machine.
+
+    python -m fast_zero.calibrate --target-ms 250
+
+Prints the `ARGON2_*` settings to use. Users' hashes are upgraded to the
+new parameters the next time they log in.
+"""
+
+import argparse
+import statistics
+import time
+
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from fast_zero.settings import Settings
+
+PASSWORD = 'calibration-password'
+# OWASP's floor for Argon2id (19 MiB).
+MIN_MEMORY_COST = 19456
+
+
+def verify_seconds(params: dict[str, int], samples: int):
+    hasher = Argon2Hasher(**params)
+    hashed = hasher.hash(PASSWORD)
+
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(PASSWORD, hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target: float,
+    memory_cost: int,
+    parallelism: int,
+    samples: int = 5,
+    min_memory_cost: int = MIN_MEMORY_COST,
+):
+    """The most expensive parameters whose verify takes at most `target`
+    seconds.
+
+    Memory is what makes GPU attacks expensive, so it is only lowered
+    when a single pass over `memory_cost` is already too slow; the rest
+    of the budget goes to extra passes.
+    """
+    params = {
+        'time_cost': 1,
+        'memory_cost': memory_cost,
+        'parallelism': parallelism,
+    }
+    seconds = verify_seconds(params, samples)
+    while seconds > target and params['memory_cost'] > min_memory_cost:
+        params['memory_cost'] = max(
+            min_memory_cost, params['memory_cost'] // 2
+        )
+        seconds = verify_seconds(params, samples)
+
+    while True:
+        candidate = {**params, 'time_cost': params['time_cost'] + 1}
+        candidate_seconds = verify_seconds(candidate, samples)
+        if candidate_seconds > target:
+            return params, seconds
+        params, seconds = candidate, candidate_seconds
+
+
+def main(args):
+    settings = Settings()
+    current = {
+        'time_cost': settings.ARGON2_TIME_COST,
+        'memory_cost': settings.ARGON2_MEMORY_COST,
+        'parallelism': settings.ARGON2_PARALLELISM,
+    }
+    current_seconds = verify_seconds(current, args.samples)
+    params, seconds = calibrate(
+        args.target_ms / 1000,
+        args.memory_cost or settings.ARGON2_MEMORY_COST,
+        args.parallelism or settings.ARGON2_PARALLELISM,
+        args.samples,
+    )
+
+    print(f'# current parameters: {current_seconds * 1000:.0f} ms per verify')
+    print(f'# calibrated parameters: {seconds * 1000:.0f} ms per verify')
+    for name, value in params.items():
+        print(f'ARGON2_{name.upper()}={value}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Pick Argon2 parameters for a target verify latency.'
+    )
+    parser.add_argument('--target-ms', type=float, default=250)
+    parser.add_argument(
+        '--memory-cost',
+        type=int,
+        default=0,
+        help='starting memory in KiB (default: ARGON2_MEMORY_COST)',
+    )
+    parser.add_argument(
+        '--parallelism',
+        type=int,
+        default=0,
+        help='lanes (default: ARGON2_PARALLELISM)',
+    )
+    parser.add_argument('--samples', type=int, default=5)
+    main(parser.parse_args())
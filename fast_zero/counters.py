@@ -0,0 +1,151 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from sqlalchemy import Date, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import (
+    TodoActivity,
+    TodoCounter,
+    TodoState,
+    database_now,
+)
+
+
+@dataclass
+class TodoChanges:
+    """What one write did to a user's todos, for `record_todo_changes`."""
+
+    states: Counter = field(default_factory=Counter)
+    created: int = 0
+    completed: int = 0
+    deleted: int = 0
+
+    def add(self, state: TodoState):
+        self.states[state] += 1
+        self.created += 1
+        self.completed += state == TodoState.done
+
+    def move(self, old: TodoState, new: TodoState):
+        if old != new:
+            self.states[old] -= 1
+            self.states[new] += 1
+            self.completed += new == TodoState.done
+
+    def remove(self, state: TodoState):
+        self.states[state] -= 1
+        self.deleted += 1
+
+
+def _database_today():
+    # By the clock that stamps `created_at`, so days line up with it.
+    return func.date(database_now(), type_=Date)
+
+
+def _increment(
+    session: AsyncSession, model, keys: dict, deltas: dict, **assign
+):
+    """Insert a row of `deltas`, or add them to the row at `keys`."""
+    dialect = session.bind.dialect.name
+    upsert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    statement = upsert(model).values(**keys, **deltas, **assign)
+    return statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={
+            **{
+                name: getattr(model, name) + delta
+                for name, delta in deltas.items()
+            },
+            **assign,
+        },
+    )
+
+
+async def record_todo_changes(
+    session: AsyncSession, user_id: int, changes: TodoChanges | None = None
+):
+    """Keep `user_id`'s counters in step with a write to its todos.
+
+    Must run in the transaction of the write, so the counters can never
+    disagree with the todos they count. Returns the new version.
+    """
+    changes = changes or TodoChanges()
+
+    states = {state.value: n for state, n in changes.states.items() if n}
+    version = await session.scalar(
+        _increment(
+            session,
+            TodoCounter,
+            {'user_id': user_id},
+            {'version': 1, **states},
+            last_activity_at=database_now(),
+        ).returning(TodoCounter.version)
+    )
+
+    activity = {
+        name: n
+        for name, n in (
+            ('created', changes.created),
+            ('completed', changes.completed),
+            ('deleted', changes.deleted),
+        )
+        if n
+    }
+    if activity:
+        await session.execute(
+            _increment(
+                session,
+                TodoActivity,
+                {'user_id': user_id, 'day': _database_today()},
+                activity,
+            )
+        )
+    return version
+
+
+async def todos_version(session: AsyncSession, user_id: int):
+    version = await session.scalar(
+        select(TodoCounter.version).where(TodoCounter.user_id == user_id)
+    )
+    return version or 0
+
+
+async def todo_stats(session: AsyncSession, user_id: int, days: int):
+    counter = (
+        await session.execute(
+            select(
+                TodoCounter.last_activity_at,
+                *(getattr(TodoCounter, state.value) for state in TodoState),
+            ).where(TodoCounter.user_id == user_id)
+        )
+    ).first()
+    states = {
+        state: getattr(counter, state.value) if counter else 0
+        for state in TodoState
+    }
+
+    today = await session.scalar(select(_database_today()))
+    since = today - timedelta(days=days - 1)
+    activity = (
+        await session.execute(
+            select(
+                func.coalesce(func.sum(TodoActivity.created), 0),
+                func.coalesce(func.sum(TodoActivity.completed), 0),
+                func.coalesce(func.sum(TodoActivity.deleted), 0),
+            ).where(TodoActivity.user_id == user_id, TodoActivity.day >= since)
+        )
+    ).one()
+
+    return {
+        'total': sum(states.values()),
+        'states': states,
+        'last_activity_at': counter.last_activity_at if counter else None,
+        'recent': {
+            'days': days,
+            'created': activity[0],
+            'completed': activity[1],
+            'deleted': activity[2],
+        },
+    }
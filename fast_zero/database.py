@@ -1,11 +1,113 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+import time
+
+from sqlalchemy import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from fast_zero.settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL)
+
+class PoolMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def stats(self, pool):
+        stats = {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredPoolMixin:
+    # `_do_get` is where a pool blocks waiting for a free connection (or
+    # opens a new one), so timing it gives the checkout wait.
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.observe(time.perf_counter() - start)
+        return connection
+
+
+class MeteredQueuePool(MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class MeteredNullPool(MeteredPoolMixin, NullPool):
+    pass
+
+
+def pool_options(settings: Settings):
+    options = {
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+    }
+
+    if settings.DATABASE_POOL == 'null':
+        # PgBouncer in transaction mode owns the pooling. Server-side
+        # prepared statements would leak between clients sharing a backend.
+        connect_args = {}
+        if make_url(settings.DATABASE_URL).get_driver_name() == 'psycopg':
+            connect_args['prepare_threshold'] = None
+        return {
+            **options,
+            'poolclass': MeteredNullPool,
+            'connect_args': connect_args,
+        }
+
+    pool_size = settings.DATABASE_POOL_SIZE
+    max_overflow = settings.DATABASE_MAX_OVERFLOW
+    if settings.DATABASE_MAX_CONNECTIONS:
+        # Split the server-wide budget evenly between server workers.
+        workers = settings.SERVER_WORKERS or 1
+        pool_size = max(1, settings.DATABASE_MAX_CONNECTIONS // workers)
+        max_overflow = 0
+
+    return {
+        **options,
+        'poolclass': MeteredQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+    }
+
+
+settings = Settings()
+
+engine = create_async_engine(settings.DATABASE_URL, **pool_options(settings))
+
+
+def pool_stats():
+    return pool_metrics.stats(engine.pool)
 
 
-def get_session():
-    with Session(engine) as session:  # pragma: no cover
+async def get_session():  # pragma: no cover
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
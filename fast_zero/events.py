@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import astuple, dataclass
+
+import orjson
+import psycopg
+import sqlalchemy
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from fast_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+CHANNEL = 'todo_events'
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD_BYTES = 7999
+MAX_EVENT_BYTES = 7900
+# `Session.info` key of the events waiting for the session to commit.
+PENDING_EVENTS = 'todo_events'
+
+
+@dataclass(frozen=True)
+class Event:
+    """A change to a user's todos, numbered by the user's todo version."""
+
+    id: int
+    type: str
+    data: str
+
+    def encode(self):
+        return f'id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n'
+
+
+def todo_event(id: int, type: str, data):
+    """An event with `data` encoded as JSON, or a reset if too large."""
+    data = orjson.dumps(data)
+    if len(data) > MAX_EVENT_BYTES:
+        return reset_event(id)
+    return Event(id, type, data.decode())
+
+
+def reset_event(id: int):
+    """Tells the client to reload its todos and carry on from `id`."""
+    return Event(id, 'reset', '{}')
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize)
+        # Id of the last event dropped because the queue was full.
+        self.dropped: int | None = None
+
+
+class EventBus:
+    """In-process pub/sub of todo events, keyed by user id.
+
+    The last `replay_size` events of recently subscribed users (at most
+    `max_users` of them) are kept, so a client reconnecting with
+    Last-Event-ID gets what it missed. Event ids are the todo version,
+    which every write bumps by one, so a gap means events were lost and
+    the client is sent a `reset` instead.
+
+    While `listen` runs, events are published through Postgres NOTIFY
+    instead, and every worker delivers them to its own subscribers.
+    """
+
+    def __init__(
+        self,
+        replay_size: int,
+        max_users: int,
+        queue_size: int,
+        heartbeat: float,
+    ):
+        self.replay_size = replay_size
+        self.max_users = max_users
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.fanout = False
+        self.clear()
+
+    def clear(self):
+        self.subscribers: defaultdict[int, set[Subscription]] = defaultdict(
+            set
+        )
+        self.history: OrderedDict[int, deque[Event]] = OrderedDict()
+
+    async def publish(self, session: AsyncSession, user_id: int, event: Event):
+        """Publish an event of a write `session` is about to commit.
+
+        Call it before the commit: the event goes out when the write
+        commits, and not at all if it rolls back. With fanout the NOTIFY
+        is part of the write's transaction, which Postgres sends on
+        commit.
+        """
+        if not self.fanout:
+            pending = session.info.setdefault(PENDING_EVENTS, [])
+            pending.append((self, user_id, event))
+            return
+
+        payload = json.dumps([user_id, *astuple(event)])
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            payload = json.dumps([user_id, *astuple(reset_event(event.id))])
+        await session.execute(select(func.pg_notify(CHANNEL, payload)))
+
+    def deliver(self, user_id: int, event: Event):
+        history = self.history.get(user_id)
+        if history is not None:
+            history.append(event)
+
+        for subscription in self.subscribers.get(user_id, ()):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped = event.id
+
+    def replay(self, user_id: int, last_event_id: int, version: int):
+        """Events after `last_event_id`, or None if some were lost."""
+        events = [
+            event
+            for event in self.history.get(user_id, ())
+            if event.id > last_event_id
+        ]
+        if events and events[0].id != last_event_id + 1:
+            return None
+        if not events and last_event_id < version:
+            return None
+        return events
+
+    @contextmanager
+    def subscribe(self, user_id: int):
+        if user_id not in self.history:
+            self.history[user_id] = deque(maxlen=self.replay_size)
+        self.history.move_to_end(user_id)
+        while len(self.history) > self.max_users:
+            self.history.popitem(last=False)
+
+        subscription = Subscription(self.queue_size)
+        self.subscribers[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self.subscribers[user_id].discard(subscription)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+    async def stream(
+        self, user_id: int, last_event_id: int | None, version: int
+    ):
+        """SSE messages for `user_id`, starting after `last_event_id`.
+
+        Without `last_event_id` the stream starts at `version`, the todo
+        version read before the stream was opened. A comment is sent
+        every `heartbeat` seconds of silence to keep proxies from closing
+        the connection.
+        """
+        with self.subscribe(user_id) as subscription:
+            last = version if last_event_id is None else last_event_id
+            events = self.replay(user_id, last, version)
+            if events is None:
+                last = version
+                yield reset_event(last).encode()
+            for event in events or ():
+                last = event.id
+                yield event.encode()
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), self.heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+
+                if subscription.dropped is not None:
+                    while not subscription.queue.empty():
+                        event = subscription.queue.get_nowait()
+                    event = reset_event(max(event.id, subscription.dropped))
+                    subscription.dropped = None
+                elif event.id <= last:
+                    continue
+                elif event.id != last + 1:
+                    event = reset_event(event.id)
+
+                last = event.id
+                yield event.encode()
+
+    async def listen(self, conninfo: str, retry_seconds: float = 1):
+        """Fan events out through Postgres until cancelled.
+
+        Every worker must run it: events published by any of them are
+        delivered to the subscribers of all of them. While the connection
+        is down, events are only delivered locally and the other workers'
+        clients get a `reset` on the next event they do see. After any
+        error it reconnects every `retry_seconds`.
+        """
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    conninfo, autocommit=True
+                ) as conn:
+                    await conn.execute(f'LISTEN {CHANNEL}')
+                    self.fanout = True
+                    async for notify in conn.notifies():
+                        user_id, *event = json.loads(notify.payload)
+                        self.deliver(user_id, Event(*event))
+            except Exception:
+                logger.exception(
+                    'Lost the %s listener, reconnecting in %ss',
+                    CHANNEL,
+                    retry_seconds,
+                )
+            finally:
+                self.fanout = False
+            await asyncio.sleep(retry_seconds)
+
+
+@sqlalchemy.event.listens_for(Session, 'after_commit')
+def _deliver_pending_events(session: Session):
+    for bus, user_id, event in session.info.pop(PENDING_EVENTS, ()):
+        bus.deliver(user_id, event)
+
+
+@sqlalchemy.event.listens_for(Session, 'after_rollback')
+def _drop_pending_events(session: Session):
+    session.info.pop(PENDING_EVENTS, None)
+
+
+todo_events = EventBus(
+    replay_size=settings.EVENTS_REPLAY_SIZE,
+    max_users=settings.EVENTS_MAX_USERS,
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    heartbeat=settings.EVENTS_HEARTBEAT_SECONDS,
+)
@@ -0,0 +1,81 @@
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import get_default_algorithms
+
+ALGORITHMS = get_default_algorithms()
+EC_ALGORITHMS = {
+    'secp256r1': 'ES256',
+    'secp384r1': 'ES384',
+    'secp521r1': 'ES512',
+}
+
+
+def algorithm_for(private_key):
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return 'RS256'
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return 'EdDSA'
+    if isinstance(private_key, ec.EllipticCurvePrivateKey):
+        return EC_ALGORITHMS[private_key.curve.name]
+    raise ValueError(f'Unsupported key type: {type(private_key).__name__}')
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Any
+    public_key: Any
+
+    @classmethod
+    def from_pem(cls, kid: str, pem: str):
+        private_key = load_pem_private_key(pem.encode(), password=None)
+        return cls(
+            kid=kid,
+            algorithm=algorithm_for(private_key),
+            private_key=private_key,
+            public_key=private_key.public_key(),
+        )
+
+    def jwk(self):
+        jwk = ALGORITHMS[self.algorithm].to_jwk(self.public_key, as_dict=True)
+        return {**jwk, 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+
+class KeySet:
+    """Asymmetric keys for access tokens, selected by `kid`.
+
+    Tokens are signed with the active key and verified with whichever key
+    their header names, so a new key can be rolled out by adding it,
+    switching `active_kid` and dropping the old one once its tokens
+    have expired. With no keys, tokens stay HMAC-signed with SECRET_KEY.
+    """
+
+    def __init__(self, pems: dict[str, str], active_kid: str | None = None):
+        self.keys = {
+            kid: SigningKey.from_pem(kid, pem) for kid, pem in pems.items()
+        }
+        if active_kid is None and len(self.keys) == 1:
+            (active_kid,) = self.keys
+        if self.keys and active_kid not in self.keys:
+            raise ValueError('JWT_ACTIVE_KID must name one of JWT_KEYS')
+
+        self.active_kid = active_kid
+        self.jwks = json.dumps({
+            'keys': [key.jwk() for key in self.keys.values()]
+        }).encode()
+
+    @property
+    def enabled(self):
+        return bool(self.keys)
+
+    @property
+    def active(self):
+        return self.keys[self.active_kid]
+
+    def get(self, kid: str | None):
+        return self.keys.get(kid)
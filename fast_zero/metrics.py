@@ -0,0 +1,182 @@
+import os
+import time
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+from fast_zero.database import pool_stats
+
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE'}
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Time to serve an HTTP request, by route template.',
+    ['method', 'route', 'status'],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests being served.',
+    multiprocess_mode='livesum',
+)
+SQL_DURATION = Histogram(
+    'db_statement_duration_seconds',
+    'Time spent executing SQL statements, by route and operation.',
+    ['route', 'operation'],
+)
+PASSWORD_HASH_DURATION = Histogram(
+    'password_hash_duration_seconds',
+    'Time spent in Argon2, including the wait for a hasher worker.',
+    ['route', 'operation'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_HASH_IN_PROGRESS = Gauge(
+    'password_hash_in_progress',
+    'Password operations running or queued on the hasher pool.',
+    multiprocess_mode='livesum',
+)
+
+# The ASGI scope of the request being served. The router adds the
+# matched route to it, so SQL and hash timings can be attributed to the
+# route template without parsing the path again.
+_request_scope: ContextVar[dict | None] = ContextVar(
+    'request_scope', default=None
+)
+
+
+def route_label(scope: dict | None = None):
+    if scope is None:
+        scope = _request_scope.get()
+        if scope is None:
+            return ''
+    route = scope.get('route')
+    return route.path if route is not None else '<unmatched>'
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        token = _request_scope.set(scope)
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(
+                scope['method'], route_label(scope), status
+            ).observe(time.perf_counter() - start)
+            REQUESTS_IN_PROGRESS.dec()
+            _request_scope.reset(token)
+
+
+def sql_operation(statement: str):
+    operation = statement.lstrip().split(None, 1)[0].upper()
+    return operation if operation in SQL_OPERATIONS else 'OTHER'
+
+
+def instrument_engine(engine):
+    sync_engine = getattr(engine, 'sync_engine', engine)
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, *args):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, *args):
+        start = conn.info['metrics_start'].pop()
+        SQL_DURATION.labels(route_label(), sql_operation(statement)).observe(
+            time.perf_counter() - start
+        )
+
+    @event.listens_for(sync_engine, 'handle_error')
+    def handle_error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get('metrics_start')
+            if starts:
+                starts.pop()
+
+
+class PoolCollector:
+    def __init__(self, stats=pool_stats):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+        yield CounterMetricFamily(
+            'db_pool_checkouts',
+            'Connections checked out of the pool.',
+            value=stats['checkouts'],
+        )
+        yield CounterMetricFamily(
+            'db_pool_checkout_timeouts',
+            'Checkouts that gave up after DATABASE_POOL_TIMEOUT.',
+            value=stats['timeouts'],
+        )
+        yield CounterMetricFamily(
+            'db_pool_checkout_wait_seconds',
+            'Total time spent waiting for a pooled connection.',
+            value=stats['wait_seconds_total'],
+        )
+        for key in ('size', 'checked_out', 'overflow'):
+            if key in stats:
+                yield GaugeMetricFamily(
+                    f'db_pool_{key}',
+                    f'Current pool {key.replace("_", " ")}.',
+                    value=stats[key],
+                )
+
+
+def registry():
+    if not MULTIPROCESS:
+        return REGISTRY
+
+    # With several server workers each process writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR and whichever one is scraped merges them.
+    # The pool collector only sees the local pool, so it is left out.
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    return merged
+
+
+def mark_process_dead():
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+if not MULTIPROCESS:
+    REGISTRY.register(PoolCollector())
+
+
+router = APIRouter(tags=['metrics'])
+
+
+@router.get('/metrics', include_in_schema=False)
+async def read_metrics():
+    return Response(
+        generate_latest(registry()), media_type=CONTENT_TYPE_LATEST
+    )
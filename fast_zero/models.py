@@ -1,11 +1,28 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Index,
+    and_,
+    cast,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.dialects.postgresql import to_tsvector, websearch_to_tsquery
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, registry
+from sqlalchemy.sql.functions import FunctionElement
 
 table_registry = registry()
 
+SEARCH_CONFIG = 'simple'
+# Soft-deleted todos stay out of the indexes hot queries use.
+LIVE_TODOS = text('deleted_at IS NULL')
+ACTIVE_USERS = text('disabled_at IS NULL')
+
 
 class TodoState(str, Enum):
     draft = 'draft'
@@ -18,22 +35,158 @@ class TodoState(str, Enum):
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    __table_args__ = (
+        # Unique among active accounts only, so a deleted account's
+        # username and email are free again before the purge removes it.
+        Index(
+            'ix_users_username',
+            'username',
+            unique=True,
+            postgresql_where=ACTIVE_USERS,
+            sqlite_where=ACTIVE_USERS,
+        ),
+        Index(
+            'ix_users_email',
+            'email',
+            unique=True,
+            postgresql_where=ACTIVE_USERS,
+            sqlite_where=ACTIVE_USERS,
+        ),
+        # Cursor pages of GET /users/?order_by=created_at.
+        Index(
+            'ix_users_created_at_id',
+            'created_at',
+            'id',
+            postgresql_where=ACTIVE_USERS,
+            sqlite_where=ACTIVE_USERS,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
-    username: Mapped[str] = mapped_column(unique=True)
+    username: Mapped[str]
     password: Mapped[str]
-    email: Mapped[str] = mapped_column(unique=True)
+    email: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
     )
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
+    # Set when the account is deleted; the row goes once its todos have.
+    disabled_at: Mapped[datetime | None] = mapped_column(
+        init=False, default=None
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TokenRevocation:
+    """Access tokens of `user_id` older than `version` are rejected.
+
+    Rows outlive the user on purpose, so tokens of deleted accounts stay
+    revoked, until the purge removes them once those tokens have expired.
+    """
+
+    __tablename__ = 'token_revocations'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int]
+    revoked_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), onupdate=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class AccountDeletion:
+    """A deleted account whose rows the purge worker is still removing.
+
+    Kept once `finished_at` is set, as a record of the deletion.
+    """
+
+    __tablename__ = 'account_deletions'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    requested_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+    todos_deleted: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        init=False, default=None
+    )
+
+
+@table_registry.mapped_as_dataclass
+class RefreshToken:
+    """A refresh token, stored as the sha256 of its value.
+
+    Every use replaces it with a new token of the same `family_id`; using a
+    replaced token again revokes the whole family.
+    """
+
+    __tablename__ = 'refresh_tokens'
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), index=True
+    )
+    token_hash: Mapped[str] = mapped_column(unique=True)
+    family_id: Mapped[str] = mapped_column(index=True)
+    # Stamped from the app's clock, like the checks against it. Replaced
+    # and revoked tokens are kept until then to catch their reuse.
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+    replaced_at: Mapped[datetime | None] = mapped_column(
+        init=False, default=None
+    )
+    revoked_at: Mapped[datetime | None] = mapped_column(
+        init=False, default=None
+    )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        # Not partial: it is also the index of the user_id foreign key,
+        # which must find soft-deleted todos too.
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index(
+            'ix_todos_user_id_state_id',
+            'user_id',
+            'state',
+            'id',
+            postgresql_where=LIVE_TODOS,
+            sqlite_where=LIVE_TODOS,
+        ),
+        Index(
+            'ix_todos_user_id_created_at_id',
+            'user_id',
+            'created_at',
+            'id',
+            postgresql_where=LIVE_TODOS,
+            sqlite_where=LIVE_TODOS,
+        ),
+        Index(
+            'ix_todos_user_id_updated_at_id',
+            'user_id',
+            'updated_at',
+            'id',
+            postgresql_where=LIVE_TODOS,
+            sqlite_where=LIVE_TODOS,
+        ),
+        Index(
+            'ix_todos_deleted_at',
+            'deleted_at',
+            postgresql_where=text('deleted_at IS NOT NULL'),
+            sqlite_where=text('deleted_at IS NOT NULL'),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
@@ -46,4 +199,126 @@ class Todo:
         init=False, server_default=func.now(), onupdate=func.now()
     )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    # Set by the delete routes; the purge worker removes the row later.
+    deleted_at: Mapped[datetime | None] = mapped_column(
+        init=False, default=None
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    """A deleted todo, so `GET /todos/changes` can tell clients about it."""
+
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index(
+            'ix_todo_tombstones_user_id_deleted_at_todo_id',
+            'user_id',
+            'deleted_at',
+            'todo_id',
+        ),
+    )
+
+    todo_id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    """Per-user counters of the todo list, kept in step by the todo routes.
+
+    `version` is bumped by every write to any of the user's todos, so it
+    can stand in for the whole list in an ETag. There is one count column
+    per `TodoState`.
+    """
+
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(default=0, server_default='0')
+    draft: Mapped[int] = mapped_column(default=0, server_default='0')
+    todo: Mapped[int] = mapped_column(default=0, server_default='0')
+    doing: Mapped[int] = mapped_column(default=0, server_default='0')
+    done: Mapped[int] = mapped_column(default=0, server_default='0')
+    trash: Mapped[int] = mapped_column(default=0, server_default='0')
+    last_activity_at: Mapped[datetime | None] = mapped_column(default=None)
+
+
+@table_registry.mapped_as_dataclass
+class TodoActivity:
+    """Todo writes of a user per day, by the database's clock."""
+
+    __tablename__ = 'todo_activity'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    created: Mapped[int] = mapped_column(default=0, server_default='0')
+    completed: Mapped[int] = mapped_column(default=0, server_default='0')
+    deleted: Mapped[int] = mapped_column(default=0, server_default='0')
+
+
+class _DatabaseNow(FunctionElement):
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(_DatabaseNow)
+def _compile_database_now(element, compiler, **kw):
+    return compiler.process(cast(func.now(), DateTime), **kw)
+
+
+@compiles(_DatabaseNow, 'sqlite')
+def _compile_database_now_sqlite(element, compiler, **kw):
+    # SQLite's CAST has no datetime type; CURRENT_TIMESTAMP is already
+    # the text its `func.now()` columns hold.
+    return 'CURRENT_TIMESTAMP'
+
+
+def database_now():
+    """The database's clock, as the naive timestamps `func.now()` columns
+    hold. Compare those columns against this rather than `utcnow()`.
+    """
+    return _DatabaseNow()
+
+
+def active_users():
+    return User.disabled_at.is_(None)
+
+
+def user_todos(user_id: int):
+    """The todos of `user_id` that haven't been deleted."""
+    return and_(Todo.user_id == user_id, Todo.deleted_at.is_(None))
+
+
+def _search_config():
+    return text(f"'{SEARCH_CONFIG}'::regconfig")
+
+
+def search_document(title, description):
+    return to_tsvector(
+        _search_config(),
+        title.concat(literal_column("' '")).concat(description),
+    )
+
+
+def search_query(q: str):
+    return websearch_to_tsquery(_search_config(), q)
+
+
+Index(
+    'ix_todos_search',
+    search_document(Todo.title, Todo.description),
+    postgresql_using='gin',
+).ddl_if(dialect='postgresql')
@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import datetime
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Select, bindparam, tuple_
+from sqlalchemy.dialects import sqlite
+
+from fast_zero.schemas import PageQuerySchema
+
+SORT_KEYS = {
+    'id': ('id',),
+    'created_at': ('created_at', 'id'),
+}
+
+# SQLite compares timestamps as text, and its CURRENT_TIMESTAMP has no
+# fraction of a second.
+CURSOR_TIMESTAMP = DateTime().with_variant(
+    sqlite.DATETIME(truncate_microseconds=True), 'sqlite'
+)
+
+
+def encode_token(data) -> str:
+    """Opaque, URL-safe encoding of JSON `data`, for cursors and tokens."""
+    raw = json.dumps(data, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token: str):
+    """The data of `encode_token`; raises ValueError if malformed."""
+    return json.loads(
+        base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    )
+
+
+def encode_cursor(order_by: str, row) -> str:
+    values = [getattr(row, key) for key in SORT_KEYS[order_by]]
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return encode_token({'o': order_by, 'v': values})
+
+
+def decode_cursor(order_by: str, cursor: str):
+    invalid_cursor = HTTPException(
+        status_code=HTTPStatus.BAD_REQUEST,
+        detail='Invalid cursor',
+    )
+    try:
+        data = decode_token(cursor)
+        if data['o'] != order_by:
+            raise invalid_cursor
+        if order_by == 'created_at':
+            created_at, id = data['v']
+            created_at = bindparam(
+                'cursor_created_at',
+                datetime.fromisoformat(created_at),
+                type_=CURSOR_TIMESTAMP,
+            )
+            return [created_at, int(id)]
+        (id,) = data['v']
+        return [int(id)]
+    except (ValueError, TypeError, KeyError):
+        raise invalid_cursor
+
+
+def paginate(query: Select, model, params: PageQuerySchema) -> Select:
+    columns = [getattr(model, key) for key in SORT_KEYS[params.order_by]]
+    query = query.order_by(*columns)
+
+    if params.cursor:
+        values = decode_cursor(params.order_by, params.cursor)
+        query = query.where(tuple_(*columns) > tuple_(*values))
+    else:
+        query = query.offset(params.offset)
+
+    return query.limit(params.limit)
+
+
+def next_cursor(rows, params: PageQuerySchema) -> str | None:
+    if not rows or len(rows) < params.limit:
+        return None
+    return encode_cursor(params.order_by, rows[-1])
@@ -0,0 +1,180 @@
+"""Remove soft-deleted todos, expired sync tombstones, expired refresh
+tokens, token revocations and deleted accounts in small batches.
+
+    python -m fast_zero.purge
+
+Todos go `PURGE_TODOS_AFTER_SECONDS` after their deletion, tombstones
+after `SYNC_TOMBSTONE_DAYS`. Without a purge running, both tables only
+grow.
+
+Runs until interrupted. Deployed as the `purge` process of fly.toml and
+the `fastzero_purge` service of docker-compose.yml. Set `PURGE_WORKER` to
+run it in every app worker instead; concurrent purges skip each other's
+rows.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from fast_zero.database import engine
+from fast_zero.models import (
+    AccountDeletion,
+    RefreshToken,
+    Todo,
+    TodoTombstone,
+    TokenRevocation,
+    User,
+    database_now,
+)
+from fast_zero.security import utcnow
+from fast_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+
+async def purge_batch(session: AsyncSession, key, column, before, size: int):
+    """Delete up to `size` rows whose `column` is older than `before`.
+
+    Returns the number of rows deleted.
+    """
+    batch = (
+        select(key)
+        .where(column < before)
+        .order_by(column)
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(column.class_)
+        .where(key.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def delete_account_batch(session: AsyncSession, size: int):
+    """Delete up to `size` todos of an account pending deletion, and the
+    account itself once it has none left.
+
+    Returns the number of todos deleted.
+    """
+    deletion = await session.scalar(
+        select(AccountDeletion)
+        .where(AccountDeletion.finished_at.is_(None))
+        .order_by(AccountDeletion.requested_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if deletion is None:
+        return 0
+
+    batch = select(Todo.id).where(Todo.user_id == deletion.user_id).limit(size)
+    result = await session.execute(
+        delete(Todo)
+        .where(Todo.id.in_(batch))
+        .execution_options(synchronize_session=False)
+    )
+    deletion.todos_deleted += result.rowcount
+    user_id, deleted = deletion.user_id, deletion.todos_deleted
+    finished = result.rowcount < size
+    if finished:
+        # The rest of the account's rows go with it, by ON DELETE CASCADE.
+        await session.execute(delete(User).where(User.id == user_id))
+        deletion.finished_at = func.now()
+    await session.commit()
+
+    logger.info('Deleting user %d: %d todos deleted', user_id, deleted)
+    if finished:
+        logger.info('Deleted user %d', user_id)
+    return result.rowcount
+
+
+async def purge_step(session: AsyncSession, size: int):
+    """One batch of each kind of row; returns how many were deleted."""
+    # The rows are stamped by the database, so age them by its clock.
+    now = database_now()
+    todos = await purge_batch(
+        session,
+        Todo.id,
+        Todo.deleted_at,
+        now - timedelta(seconds=settings.PURGE_TODOS_AFTER_SECONDS),
+        size,
+    )
+    tombstones = await purge_batch(
+        session,
+        TodoTombstone.todo_id,
+        TodoTombstone.deleted_at,
+        now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS),
+        size,
+    )
+    # Expiry is set from the app's clock, so it is checked against it.
+    refresh_tokens = await purge_batch(
+        session, RefreshToken.id, RefreshToken.expires_at, utcnow(), size
+    )
+    # Every token a revocation rejects has expired by then.
+    revocations = await purge_batch(
+        session,
+        TokenRevocation.user_id,
+        TokenRevocation.revoked_at,
+        now - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        size,
+    )
+    accounts = await delete_account_batch(session, size)
+    return todos, tombstones, refresh_tokens, revocations, accounts
+
+
+async def run_purge(
+    engine: AsyncEngine,
+    size: int,
+    rows_per_second: float,
+    idle_seconds: float,
+):
+    """Purge until cancelled, deleting at most `rows_per_second`.
+
+    Each batch is its own short transaction, so requests never wait long
+    on the purge's row locks. Once there's nothing left to purge, or
+    after an error, checks again every `idle_seconds`.
+    """
+    while True:
+        start = time.monotonic()
+        try:
+            async with AsyncSession(engine) as session:
+                removed = await purge_step(session, size)
+        except Exception:
+            logger.exception('Purge failed, retrying in %ss', idle_seconds)
+            await asyncio.sleep(idle_seconds)
+            continue
+        if any(removed):
+            logger.info(
+                'Purged %d todos, %d tombstones, %d refresh tokens, %d '
+                'token revocations and %d todos of deleted accounts',
+                *removed,
+            )
+
+        if max(removed) < size:
+            await asyncio.sleep(idle_seconds)
+        else:
+            elapsed = time.monotonic() - start
+            await asyncio.sleep(
+                max(sum(removed) / rows_per_second - elapsed, 0)
+            )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        run_purge(
+            engine,
+            settings.PURGE_BATCH_SIZE,
+            settings.PURGE_ROWS_PER_SECOND,
+            settings.PURGE_IDLE_SECONDS,
+        )
+    )
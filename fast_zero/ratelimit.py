@@ -0,0 +1,183 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from http import HTTPStatus
+from typing import Protocol
+
+from fastapi import HTTPException, Request
+
+from fast_zero.security import password_hasher
+from fast_zero.settings import Settings
+from fast_zero.types import T_OAuth2Form
+
+settings = Settings()
+
+
+def too_many_requests(retry_after: float):
+    return HTTPException(
+        status_code=HTTPStatus.TOO_MANY_REQUESTS,
+        detail='Too many requests',
+        headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitBackend(Protocol):
+    """Storage of the token buckets used by `RateLimiter`.
+
+    The in-process `MemoryRateLimitBackend` is the default, which gives
+    every worker its own buckets. A shared backend (e.g. Redis running
+    the same arithmetic in a Lua script) only has to implement `take` and
+    be assigned to `rate_limiter.backend` at startup.
+    """
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token from `key`'s bucket.
+
+        Returns 0 on success, otherwise the seconds until a token is free.
+        """
+
+
+class MemoryRateLimitBackend:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def take(self, key: str, rate: float, burst: int):
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # An evicted bucket comes back full, so only idle keys are dropped
+        # in practice.
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.rejected = 0
+
+    async def check(self, key: str, per_minute: int, burst: int):
+        """Raise 429 once `key` has used up `burst` requests and is
+        going faster than `per_minute`. A rate of 0 disables the check.
+        """
+        if per_minute <= 0:
+            return
+
+        retry_after = await self.backend.take(key, per_minute / 60, burst)
+        if retry_after:
+            self.rejected += 1
+            raise too_many_requests(retry_after)
+
+    def stats(self):
+        return {'rejected': self.rejected}
+
+
+class ConcurrencyLimit:
+    """Admits at most `limit` callers at once. The rest wait in line for
+    up to `timeout` seconds and are then turned away with 503.
+    """
+
+    def __init__(self, limit: int, timeout: float):
+        self.limit = limit
+        self.timeout = timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def __aenter__(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        # A caller leaving hands its slot straight to the first waiter.
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            self._give_up(waiter)
+            self.rejected += 1
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Too many concurrent logins',
+                headers={'Retry-After': '1'},
+            )
+        except asyncio.CancelledError:
+            self._give_up(waiter)
+            raise
+
+    async def __aexit__(self, *exc_info):
+        self._release()
+
+    def _give_up(self, waiter: asyncio.Future):
+        if waiter.done():
+            # Handed a slot just as we gave up; pass it on.
+            self._release()
+        else:
+            self._waiters.remove(waiter)
+
+    def _release(self):
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.active -= 1
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'waiting': len(self._waiters),
+            'rejected': self.rejected,
+        }
+
+
+rate_limiter = RateLimiter(
+    MemoryRateLimitBackend(maxsize=settings.RATE_LIMIT_MAXSIZE)
+)
+
+# One slot per hasher worker by default: logins beyond that would only
+# queue on the pool.
+login_verifications = ConcurrencyLimit(
+    settings.LOGIN_MAX_CONCURRENT_VERIFICATIONS or password_hasher.workers,
+    settings.LOGIN_VERIFICATION_TIMEOUT_SECONDS,
+)
+
+
+def client_ip(request: Request):
+    # Behind a proxy, uvicorn sets the client from X-Forwarded-For when
+    # the proxy is in SERVER_FORWARDED_ALLOW_IPS.
+    return request.client.host if request.client else 'unknown'
+
+
+async def limit_client_ip(request: Request):
+    await rate_limiter.check(
+        f'ip:{client_ip(request)}',
+        settings.AUTH_IP_RATE_PER_MINUTE,
+        settings.AUTH_IP_BURST,
+    )
+
+
+async def limit_login_username(form_data: T_OAuth2Form):
+    await rate_limiter.check(
+        f'username:{form_data.username.lower()}',
+        settings.LOGIN_USERNAME_RATE_PER_MINUTE,
+        settings.LOGIN_USERNAME_BURST,
+    )
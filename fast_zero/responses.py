@@ -0,0 +1,68 @@
+import hashlib
+from http import HTTPStatus
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+
+
+def select_fields(model, schema: type[BaseModel]) -> Select:
+    """Select only the columns `schema` exposes, in its field order."""
+    return select(*(getattr(model, field) for field in schema.model_fields))
+
+
+def page_response(
+    key: str, rows, cursor: str | None, headers: dict[str, str] | None = None
+) -> ORJSONResponse:
+    """Encode rows from `select_fields` straight to JSON.
+
+    Returning a response skips the `response_model` validation, so the
+    rows must already match the schema declared on the route.
+    """
+    return ORJSONResponse(
+        {
+            key: [row._asdict() for row in rows],
+            'next_cursor': cursor,
+        },
+        headers=headers,
+    )
+
+
+def model_response(
+    schema: type[BaseModel],
+    obj,
+    status_code: int = HTTPStatus.OK,
+    headers: dict[str, str] | None = None,
+) -> ORJSONResponse:
+    """Serialize `obj` through `schema`, for routes that set headers."""
+    return ORJSONResponse(
+        schema.model_validate(obj, from_attributes=True).model_dump(
+            mode='json'
+        ),
+        status_code=status_code,
+        headers=headers,
+    )
+
+
+def make_etag(*parts) -> str:
+    """A strong ETag for the values a response is derived from."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(header: str | None, etag: str, *, weak: bool = True):
+    """Whether an If-None-Match (`weak`) or If-Match header matches."""
+    if not header:
+        return False
+
+    tags = [tag.strip() for tag in header.split(',')]
+    if weak:
+        tags = [tag.removeprefix('W/') for tag in tags]
+    return '*' in tags or etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
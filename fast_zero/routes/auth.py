@@ -1,40 +1,92 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 
-from fast_zero.models import User
+from fast_zero.models import User, active_users
+from fast_zero.ratelimit import (
+    limit_client_ip,
+    limit_login_username,
+    login_verifications,
+)
+from fast_zero.schemas import RefreshTokenSchema
 from fast_zero.security import (
     create_access_token,
-    verify_password,
+    credentials_exception,
+    issue_refresh_token,
+    rotate_refresh_token,
+    verify_and_update_password_async,
 )
 from fast_zero.types import T_CurrentUser, T_OAuth2Form, T_Session
 
 router = APIRouter(
     prefix='/auth',
     tags=['auth'],
+    dependencies=[Depends(limit_client_ip)],
 )
 
 
-@router.post('/token/')
-def login_for_access_token(
+@router.post(
+    '/token/',
+    dependencies=[Depends(limit_login_username)],
+)
+async def login_for_access_token(
     form_data: T_OAuth2Form,
     session: T_Session,
 ):
-    user = session.scalar(select(User).where(User.email == form_data.username))
-    if not user or not verify_password(form_data.password, user.password):
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username, active_users())
+    )
+    verified, new_hash = False, None
+    if user:
+        async with login_verifications:
+            verified, new_hash = await verify_and_update_password_async(
+                form_data.password, user.password
+            )
+    if not verified:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password',
         )
-    access_token = create_access_token({'sub': user.email})
+    if new_hash:
+        # Hashed with older Argon2 parameters; upgrade it while we have
+        # the plain password.
+        user.password = new_hash
+    access_token = create_access_token({'sub': user.email}, user)
+    refresh_token = issue_refresh_token(session, user.id)
+    await session.commit()
+
+    return {
+        'access_token': access_token,
+        'token_type': 'bearer',
+        'refresh_token': refresh_token,
+    }
+
+
+@router.post('/token/refresh/')
+async def rotate_access_token(
+    body: RefreshTokenSchema,
+    session: T_Session,
+):
+    user_id, refresh_token = await rotate_refresh_token(
+        session, body.refresh_token
+    )
+    user = await session.get(User, user_id)
+    if not user or user.disabled_at:
+        raise credentials_exception()
+    access_token = create_access_token({'sub': user.email}, user)
+    await session.commit()
 
-    return {'access_token': access_token, 'token_type': 'bearer'}
+    return {
+        'access_token': access_token,
+        'token_type': 'bearer',
+        'refresh_token': refresh_token,
+    }
 
 
 @router.post('/refresh_token/')
-def refresh_access_token(
+async def refresh_access_token(
     user: T_CurrentUser,
 ):
-    new_access_token = create_access_token({'sub': user.email})
+    new_access_token = create_access_token({'sub': user.email}, user)
     return {'access_token': new_access_token, 'token_type': 'bearer'}
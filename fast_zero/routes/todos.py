@@ -1,28 +1,107 @@
+import csv
+import io
 from http import HTTPStatus
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import orjson
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, insert, or_, select, update
 
-from fast_zero.models import Todo
+from fast_zero.counters import (
+    TodoChanges,
+    record_todo_changes,
+    todo_stats,
+    todos_version,
+)
+from fast_zero.events import todo_event, todo_events
+from fast_zero.models import (
+    Todo,
+    search_document,
+    search_query,
+    user_todos,
+)
+from fast_zero.pagination import next_cursor, paginate
+from fast_zero.responses import (
+    etag_matches,
+    make_etag,
+    model_response,
+    not_modified,
+    page_response,
+    select_fields,
+)
 from fast_zero.schemas import (
+    TodoBulkListSchema,
+    TodoBulkUpdateSchema,
     TodoListPulicSchema,
     TodoPulicSchema,
     TodoQuerySchema,
     TodoSchema,
+    TodoStatsSchema,
+    TodoSyncSchema,
     TodoUpdateSchema,
 )
-from fast_zero.types import T_CurrentUser, T_Session
+from fast_zero.sync import record_tombstones, todo_changes
+from fast_zero.types import T_Principal, T_Session
 
 router = APIRouter(
     prefix='/todos',
     tags=['todos'],
 )
 
+BULK_MAX_ITEMS = 1000
+CHANGES_MAX_ITEMS = 1000
+STATS_MAX_DAYS = 90
+EXPORT_CHUNK_SIZE = 1000
+UPDATE_FIELDS = tuple(TodoUpdateSchema.model_fields)
+EXPORT_COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'state',
+    'created_at',
+    'updated_at',
+)
+
+
+def search_todos(q: str, dialect: str):
+    if dialect == 'postgresql':
+        return search_document(Todo.title, Todo.description).bool_op('@@')(
+            search_query(q)
+        )
+
+    pattern = '%{}%'.format(
+        q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+    return or_(
+        Todo.title.ilike(pattern, escape='\\'),
+        Todo.description.ilike(pattern, escape='\\'),
+    )
+
+
+def todo_etag(todo: Todo):
+    return make_etag('todo', todo.id, todo.updated_at)
+
+
+def todos_event(version: int, type: str, todos):
+    return todo_event(
+        version,
+        type,
+        {
+            'todos': [
+                TodoPulicSchema.model_validate(
+                    todo, from_attributes=True
+                ).model_dump(mode='json')
+                for todo in todos
+            ]
+        },
+    )
+
 
 @router.post(
     '/', response_model=TodoPulicSchema, status_code=HTTPStatus.CREATED
 )
-def create_todo(todo: TodoSchema, user: T_CurrentUser, session: T_Session):
+async def create_todo(todo: TodoSchema, user: T_Principal, session: T_Session):
     db_todo = Todo(
         title=todo.title,
         description=todo.description,
@@ -31,20 +110,198 @@ def create_todo(todo: TodoSchema, user: T_CurrentUser, session: T_Session):
     )
 
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    changes = TodoChanges()
+    changes.add(todo.state)
+    version = await record_todo_changes(session, user.id, changes)
+    await session.flush()
+    await session.refresh(db_todo)
+    await todo_events.publish(
+        session, user.id, todos_event(version, 'created', [db_todo])
+    )
+    await session.commit()
 
-    return db_todo
+    return model_response(
+        TodoPulicSchema,
+        db_todo,
+        status_code=HTTPStatus.CREATED,
+        headers={'ETag': todo_etag(db_todo)},
+    )
+
+
+@router.post(
+    '/bulk', response_model=TodoBulkListSchema, status_code=HTTPStatus.CREATED
+)
+async def create_todos_bulk(
+    todos: Annotated[
+        list[TodoSchema], Body(min_length=1, max_length=BULK_MAX_ITEMS)
+    ],
+    user: T_Principal,
+    session: T_Session,
+):
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), 'user_id': user.id} for todo in todos],
+    )
+    results = [
+        {'id': todo.id, 'status': HTTPStatus.CREATED, 'todo': todo}
+        for todo in db_todos
+    ]
+    changes = TodoChanges()
+    for todo in todos:
+        changes.add(todo.state)
+    version = await record_todo_changes(session, user.id, changes)
+    await todo_events.publish(
+        session,
+        user.id,
+        todos_event(
+            version, 'created', [result['todo'] for result in results]
+        ),
+    )
+    await session.commit()
+
+    return {'results': results}
+
+
+@router.patch('/bulk', response_model=TodoBulkListSchema)
+async def update_todos_bulk(
+    todos: Annotated[
+        list[TodoBulkUpdateSchema],
+        Body(min_length=1, max_length=BULK_MAX_ITEMS),
+    ],
+    user: T_Principal,
+    session: T_Session,
+):
+    # Locked until commit, in id order so concurrent bulk writes can't
+    # deadlock: the changes and the counters are computed from these rows.
+    rows = await session.execute(
+        select(Todo.id, *(getattr(Todo, field) for field in UPDATE_FIELDS))
+        .where(user_todos(user.id), Todo.id.in_({todo.id for todo in todos}))
+        .order_by(Todo.id)
+        .with_for_update()
+    )
+    current = {id: dict(zip(UPDATE_FIELDS, row)) for id, *row in rows}
+    owned = set(current)
+
+    values: dict[int, dict] = {}
+    counted = TodoChanges()
+    for todo in todos:
+        if todo.id not in owned:
+            continue
+        row = current[todo.id]
+        for key, value in todo.model_dump(
+            exclude_unset=True, exclude={'id'}
+        ).items():
+            if row[key] != value:
+                if key == 'state':
+                    counted.move(row[key], value)
+                row[key] = value
+                values.setdefault(todo.id, {})[key] = value
+
+    changes = [
+        {'id': id, **changed_values} for id, changed_values in values.items()
+    ]
+    if changes:
+        # The rows are reloaded below, so the session needs no syncing.
+        await session.execute(
+            update(Todo)
+            .where(user_todos(user.id))
+            .execution_options(synchronize_session=False),
+            changes,
+        )
+        version = await record_todo_changes(session, user.id, counted)
+
+    updated = {
+        todo.id: todo
+        for todo in await session.scalars(
+            select(Todo)
+            .where(Todo.id.in_(owned))
+            .execution_options(populate_existing=True)
+        )
+    }
+    if changes:
+        await todo_events.publish(
+            session,
+            user.id,
+            todos_event(version, 'updated', [updated[id] for id in values]),
+        )
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': todo.id, 'status': HTTPStatus.OK, 'todo': updated[todo.id]}
+            if todo.id in updated
+            else {
+                'id': todo.id,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            }
+            for todo in todos
+        ]
+    }
+
+
+@router.delete('/bulk', response_model=TodoBulkListSchema)
+async def delete_todos_bulk(
+    ids: Annotated[list[int], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    user: T_Principal,
+    session: T_Session,
+):
+    deleted = dict(
+        (
+            await session.execute(
+                update(Todo)
+                .where(user_todos(user.id), Todo.id.in_(ids))
+                .values(deleted_at=func.now())
+                .returning(Todo.id, Todo.state)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+    )
+    if deleted:
+        changes = TodoChanges()
+        for state in deleted.values():
+            changes.remove(state)
+        version = await record_todo_changes(session, user.id, changes)
+        await record_tombstones(session, user.id, deleted)
+        await todo_events.publish(
+            session,
+            user.id,
+            todo_event(version, 'deleted', {'ids': list(deleted)}),
+        )
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': id, 'status': HTTPStatus.OK}
+            if id in deleted
+            else {
+                'id': id,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            }
+            for id in ids
+        ]
+    }
 
 
 @router.get('/', response_model=TodoListPulicSchema)
-def read_todos(
-    user: T_CurrentUser,
+async def read_todos(
+    user: T_Principal,
     session: T_Session,
     params: TodoQuerySchema = Depends(TodoQuerySchema),
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    # Read before the page, so a write committed in between can only make
+    # the ETag older than the body, never newer.
+    version = await todos_version(session, user.id)
+    etag = make_etag('todos', user.id, version, params.model_dump())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    query = select_fields(Todo, TodoPulicSchema).where(user_todos(user.id))
 
+    if params.q:
+        query = query.filter(search_todos(params.q, session.bind.dialect.name))
     if params.title:
         query = query.filter(Todo.title.contains(params.title))
     if params.description:
@@ -52,44 +309,159 @@ def read_todos(
     if params.state:
         query = query.filter(Todo.state == params.state)
 
-    query = query.offset(params.offset).limit(params.limit)
+    query = paginate(query, Todo, params)
 
-    todos = session.scalars(query)
-    return {'todos': todos}
+    todos = (await session.execute(query)).all()
+    return page_response(
+        'todos', todos, next_cursor(todos, params), headers={'ETag': etag}
+    )
 
 
-@router.delete('/{todo_id}', status_code=HTTPStatus.OK)
-def delete_todo(todo_id: int, user: T_CurrentUser, session: T_Session):
-    todo = session.scalar(
-        select(Todo).where(
-            Todo.user_id == user.id,
-            Todo.id == todo_id,
+@router.get('/stats', response_model=TodoStatsSchema)
+async def read_todo_stats(
+    user: T_Principal,
+    session: T_Session,
+    days: Annotated[int, Query(ge=1, le=STATS_MAX_DAYS)] = 7,
+):
+    return await todo_stats(session, user.id, days)
+
+
+@router.get('/changes', response_model=TodoSyncSchema)
+async def read_todo_changes(
+    user: T_Principal,
+    session: T_Session,
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=CHANGES_MAX_ITEMS)] = 100,
+):
+    # Clients call again with `next_token` until `has_more` is false, and
+    # keep the last token for their next sync.
+    return ORJSONResponse(await todo_changes(session, user.id, since, limit))
+
+
+def _export_values(row):
+    return (
+        row.id,
+        row.title,
+        row.description,
+        row.state.value,
+        row.created_at.isoformat(),
+        row.updated_at.isoformat(),
+    )
+
+
+def _export_ndjson(rows):
+    return b''.join(
+        orjson.dumps(
+            dict(zip(EXPORT_COLUMNS, row)), option=orjson.OPT_APPEND_NEWLINE
         )
+        for row in rows
+    )
+
+
+def _export_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+@router.get('/export')
+async def export_todos(
+    user: T_Principal,
+    session: T_Session,
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+):
+    query = (
+        select(*(getattr(Todo, column) for column in EXPORT_COLUMNS))
+        .where(user_todos(user.id))
+        .order_by(Todo.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
     )
+    encode = _export_csv if format == 'csv' else _export_ndjson
 
-    if todo is None:
+    # The session dependency is closed as soon as this function returns;
+    # the generator reopens it for the duration of the stream.
+    async def content():
+        try:
+            if format == 'csv':
+                yield _export_csv([EXPORT_COLUMNS])
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield encode(_export_values(row) for row in rows)
+        finally:
+            await session.close()
+
+    media_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={
+            'Content-Disposition': f'attachment; filename="todos.{format}"'
+        },
+    )
+
+
+@router.get('/events')
+async def stream_todo_events(
+    user: T_Principal,
+    session: T_Session,
+    last_event_id: Annotated[int | None, Header()] = None,
+):
+    """Server-sent events of the user's todos: `created` and `updated`
+    carry the todos, `deleted` their ids, and `reset` means events were
+    lost and the list must be reloaded.
+    """
+    version = await todos_version(session, user.id)
+    # The stream can last for hours; don't hold a connection for it.
+    await session.close()
+
+    return StreamingResponse(
+        todo_events.stream(user.id, last_event_id, version),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.delete('/{todo_id}', status_code=HTTPStatus.OK)
+async def delete_todo(todo_id: int, user: T_Principal, session: T_Session):
+    state = await session.scalar(
+        update(Todo)
+        .where(user_todos(user.id), Todo.id == todo_id)
+        .values(deleted_at=func.now())
+        .returning(Todo.state)
+        .execution_options(synchronize_session=False)
+    )
+
+    if state is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Task not found.',
         )
 
-    session.delete(todo)
-    session.commit()
+    changes = TodoChanges()
+    changes.remove(state)
+    version = await record_todo_changes(session, user.id, changes)
+    await record_tombstones(session, user.id, [todo_id])
+    await todo_events.publish(
+        session, user.id, todo_event(version, 'deleted', {'ids': [todo_id]})
+    )
+    await session.commit()
     return {'message': 'Task has been deleted successfully.'}
 
 
 @router.patch('/{todo_id}', response_model=TodoPulicSchema)
-def update_todo(
-    user: T_CurrentUser,
+async def update_todo(
+    user: T_Principal,
     session: T_Session,
     todo_id: int,
     todo: TodoUpdateSchema,
+    if_match: Annotated[str | None, Header()] = None,
 ):
-    db_todo = session.scalar(
-        select(Todo).where(
-            Todo.user_id == user.id,
-            Todo.id == todo_id,
-        )
+    # Held until commit, so the If-Match check, the counters' move from
+    # the old state and the write all see the same row.
+    db_todo = await session.scalar(
+        select(Todo)
+        .where(user_todos(user.id), Todo.id == todo_id)
+        .with_for_update()
     )
 
     if db_todo is None:
@@ -97,10 +469,37 @@ def update_todo(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Task not found.',
         )
+    if if_match and not etag_matches(if_match, todo_etag(db_todo), weak=False):
+        raise HTTPException(
+            status_code=HTTPStatus.PRECONDITION_FAILED,
+            detail='Task has been modified.',
+        )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
+    values = {
+        key: value
+        for key, value in todo.model_dump(exclude_unset=True).items()
+        if getattr(db_todo, key) != value
+    }
+    if not values:
+        # Nothing to write: keep updated_at, the version and every ETag.
+        return model_response(
+            TodoPulicSchema, db_todo, headers={'ETag': todo_etag(db_todo)}
+        )
+
+    changes = TodoChanges()
+    old_state = db_todo.state
+    for key, value in values.items():
         setattr(db_todo, key, value)
+    changes.move(old_state, db_todo.state)
 
-    session.commit()
-    session.refresh(db_todo)
-    return db_todo
+    version = await record_todo_changes(session, user.id, changes)
+    await session.flush()
+    await session.refresh(db_todo)
+    await todo_events.publish(
+        session, user.id, todos_event(version, 'updated', [db_todo])
+    )
+    await session.commit()
+
+    return model_response(
+        TodoPulicSchema, db_todo, headers={'ETag': todo_etag(db_todo)}
+    )
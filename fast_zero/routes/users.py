@@ -1,16 +1,32 @@
 from http import HTTPStatus
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy import select
 
-from fast_zero.models import User
+from fast_zero.cache import token_denylist, user_cache
+from fast_zero.models import AccountDeletion, RefreshToken, User, active_users
+from fast_zero.pagination import next_cursor, paginate
+from fast_zero.responses import (
+    etag_matches,
+    make_etag,
+    model_response,
+    not_modified,
+    page_response,
+    select_fields,
+)
 from fast_zero.schemas import (
     Message,
+    PageQuerySchema,
     UserListSchema,
     UserPublicSchema,
     UserSchema,
 )
-from fast_zero.security import get_password_hash
+from fast_zero.security import (
+    get_password_hash_async,
+    revoke_refresh_tokens,
+    utcnow,
+)
 from fast_zero.types import T_CurrentUser, T_Session
 
 router = APIRouter(
@@ -22,10 +38,11 @@ router = APIRouter(
 @router.post(
     '/', status_code=HTTPStatus.CREATED, response_model=UserPublicSchema
 )
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
+async def create_user(user: UserSchema, session: T_Session):
+    db_user = await session.scalar(
         select(User).where(
-            (User.username == user.username) | (User.email == user.email)
+            (User.username == user.username) | (User.email == user.email),
+            active_users(),
         )
     )
 
@@ -42,40 +59,65 @@ def create_user(user: UserSchema, session: T_Session):
             )
     db_user = User(
         username=user.username,
-        password=get_password_hash(user.password),
+        password=await get_password_hash_async(user.password),
         email=user.email,
     )
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
 
     return db_user
 
 
 @router.get('/', response_model=UserListSchema)
-def read_users(
+async def read_users(
     session: T_Session,
-    limit: int = 10,
-    offset: int = 0,
+    params: PageQuerySchema = Depends(PageQuerySchema),
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    users = session.scalars(select(User).limit(limit).offset(offset))
-    return {'users': users}
+    query = paginate(
+        select_fields(User, UserPublicSchema).where(active_users()),
+        User,
+        params,
+    )
+
+    # There is no cheaper stand-in for a page of users than the page
+    # itself, so the query still runs; a match only saves the encoding
+    # and the transfer.
+    users = (await session.execute(query)).all()
+    etag = make_etag('users', params.model_dump(), *map(tuple, users))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return page_response(
+        'users', users, next_cursor(users, params), headers={'ETag': etag}
+    )
 
 
 @router.get('/{user_id}', response_model=UserPublicSchema)
-def get_user(user_id: int, session: T_Session):
-    user = session.scalar(select(User).where(User.id == user_id))
+async def get_user(
+    user_id: int,
+    session: T_Session,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    user = await session.scalar(
+        select(User).where(User.id == user_id, active_users())
+    )
     if not user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='User not found',
         )
 
-    return user
+    etag = make_etag('user', user.id, user.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return model_response(UserPublicSchema, user, headers={'ETag': etag})
 
 
 @router.put('/{user_id}', response_model=UserPublicSchema)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -89,10 +131,11 @@ def update_user(
 
     query = select(User).where(
         (User.id != user_id)
-        & ((User.username == user.username) | (User.email == user.email))
+        & ((User.username == user.username) | (User.email == user.email)),
+        active_users(),
     )
 
-    user_with_same_username_or_email = session.scalar(query)
+    user_with_same_username_or_email = await session.scalar(query)
 
     if user_with_same_username_or_email:
         if user_with_same_username_or_email.username == user.username:
@@ -106,17 +149,26 @@ def update_user(
                 detail='Email already exists',
             )
 
+    subject = current_user.email
     current_user.username = user.username
-    current_user.password = get_password_hash(user.password)
+    current_user.password = await get_password_hash_async(user.password)
     current_user.email = user.email
-    session.commit()
-    session.refresh(current_user)
+    current_user.token_version += 1
+    await token_denylist.revoke(
+        session, current_user.id, current_user.token_version
+    )
+    await revoke_refresh_tokens(
+        session, RefreshToken.user_id == current_user.id
+    )
+    await session.commit()
+    await user_cache.invalidate(subject)
+    await session.refresh(current_user)
 
     return current_user
 
 
 @router.delete('/{user_id}', response_model=Message)
-def delete_user(
+async def delete_user(
     user_id: int,
     session: T_Session,
     current_user: T_CurrentUser,
@@ -126,7 +178,18 @@ def delete_user(
             status_code=HTTPStatus.FORBIDDEN,
             detail='Not enough permission',
         )
-    session.delete(current_user)
-    session.commit()
+    # Disable the account now; the purge worker removes its todos in
+    # batches and then the account itself.
+    current_user.disabled_at = utcnow()
+    current_user.token_version += 1
+    await token_denylist.revoke(
+        session, current_user.id, current_user.token_version
+    )
+    await revoke_refresh_tokens(
+        session, RefreshToken.user_id == current_user.id
+    )
+    session.add(AccountDeletion(user_id=current_user.id))
+    await session.commit()
+    await user_cache.invalidate(current_user.email)
 
     return {'message': 'User deleted'}
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, EmailStr, NaiveDatetime
 
 from fast_zero.models import TodoState
@@ -22,6 +24,7 @@ class UserDB(UserSchema):
 
 class UserListSchema(BaseModel):
     users: list[UserPublicSchema]
+    next_cursor: str | None = None
 
 
 class Message(BaseModel):
@@ -31,6 +34,11 @@ class Message(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshTokenSchema(BaseModel):
+    refresh_token: str
 
 
 class TodoSchema(BaseModel):
@@ -47,6 +55,28 @@ class TodoPulicSchema(TodoSchema):
 
 class TodoListPulicSchema(BaseModel):
     todos: list[TodoPulicSchema]
+    next_cursor: str | None = None
+
+
+class TodoSyncSchema(BaseModel):
+    todos: list[TodoPulicSchema]
+    deleted: list[int]
+    next_token: str
+    has_more: bool
+
+
+class TodoActivitySchema(BaseModel):
+    days: int
+    created: int
+    completed: int
+    deleted: int
+
+
+class TodoStatsSchema(BaseModel):
+    total: int
+    states: dict[TodoState, int]
+    last_activity_at: NaiveDatetime | None
+    recent: TodoActivitySchema
 
 
 class TodoUpdateSchema(BaseModel):
@@ -55,9 +85,30 @@ class TodoUpdateSchema(BaseModel):
     state: TodoState | None = None
 
 
-class TodoQuerySchema(BaseModel):
+class TodoBulkUpdateSchema(TodoUpdateSchema):
+    id: int
+
+
+class TodoBulkResultSchema(BaseModel):
+    id: int
+    status: int
+    todo: TodoPulicSchema | None = None
+    detail: str | None = None
+
+
+class TodoBulkListSchema(BaseModel):
+    results: list[TodoBulkResultSchema]
+
+
+class PageQuerySchema(BaseModel):
+    offset: int = 0
+    limit: int = 10
+    cursor: str | None = None
+    order_by: Literal['id', 'created_at'] = 'id'
+
+
+class TodoQuerySchema(PageQuerySchema):
+    q: str | None = None
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
-    offset: int = 0
-    limit: int = 10
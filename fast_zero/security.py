@@ -1,24 +1,56 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import secrets
+import time
+import uuid
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import ExpiredSignatureError, decode, encode
-from jwt.exceptions import PyJWTError
+from jwt import ExpiredSignatureError, decode, encode, get_unverified_header
+from jwt.exceptions import InvalidKeyError, PyJWTError
 from pwdlib import PasswordHash
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from zoneinfo import ZoneInfo
 
+from fast_zero.cache import token_cache, token_denylist, user_cache
 from fast_zero.database import get_session
-from fast_zero.models import User
+from fast_zero.keys import KeySet
+from fast_zero.metrics import (
+    PASSWORD_HASH_DURATION,
+    PASSWORD_HASH_IN_PROGRESS,
+    route_label,
+)
+from fast_zero.models import RefreshToken, User, active_users
 from fast_zero.settings import Settings
 
-pwd_context = PasswordHash.recommended()
-
 settings = Settings()
 
 
+def argon2_hasher(settings: Settings):
+    return Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
+pwd_context = PasswordHash((argon2_hasher(settings),))
+
+key_set = KeySet(settings.JWT_KEYS, settings.JWT_ACTIVE_KID)
+
+
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
@@ -27,12 +59,110 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: dict):
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Like `verify_password`, but also returns a new hash when
+    `hashed_password` was made with other Argon2 parameters.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs Argon2 off the event loop on a dedicated, bounded pool.
+
+    Calls beyond `max_pending` (running + queued) are rejected with 503
+    instead of piling up behind a burst of logins.
+    """
+
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='password-hasher',
+                )
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Too many concurrent password operations',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        PASSWORD_HASH_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            PASSWORD_HASH_DURATION.labels(
+                route_label(), func.__name__
+            ).observe(time.perf_counter() - start)
+            PASSWORD_HASH_IN_PROGRESS.dec()
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def get_password_hash_async(password: str):
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await password_hasher.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+):
+    return await password_hasher.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
+def create_access_token(data: dict, user: User | None = None):
     to_encode = data.copy()
+    if user is not None:
+        to_encode.update({'uid': user.id, 'ver': user.token_version})
     expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
     to_encode.update({'exp': expire})
+    if key_set.enabled:
+        key = key_set.active
+        return encode(
+            to_encode,
+            key.private_key,
+            algorithm=key.algorithm,
+            headers={'kid': key.kid},
+        )
     encoded_jwt = encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
@@ -42,29 +172,180 @@ def create_access_token(data: dict):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/token/')
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class TokenUser:
+    """Principal taken from the token claims alone (`AUTH_STATELESS`)."""
+
+    id: int
+    email: str
+
+
+def credentials_exception():
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
-    try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        email = payload.get('sub')
-        if not email:
-            raise credentials_exception
-    except ExpiredSignatureError:
-        raise credentials_exception
-    except PyJWTError:
-        raise credentials_exception
-
-    user = session.scalar(select(User).where(User.email == email))
+
+
+def verification_key(token: str):
+    if not key_set.enabled:
+        return settings.SECRET_KEY, [settings.ALGORITHM]
+
+    key = key_set.get(get_unverified_header(token).get('kid'))
+    if key is None:
+        raise InvalidKeyError('Unknown kid')
+    return key.public_key, [key.algorithm]
+
+
+def decode_access_token(token: str):
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = decode(token, *verification_key(token))
+        except ExpiredSignatureError:
+            raise credentials_exception()
+        except PyJWTError:
+            raise credentials_exception()
+        token_cache.set(token, payload)
+
+    if not payload.get('sub'):
+        raise credentials_exception()
+    return payload
+
+
+async def load_user(session: AsyncSession, payload: dict):
+    email = payload['sub']
+    version = payload.get('ver')
+    user = await user_cache.get(session, email)
+    if user and version is not None:
+        # Other workers only invalidate their own cache; their revocations
+        # reach this one through the denylist. A stale entry is reloaded.
+        if version != user.token_version or await token_denylist.is_revoked(
+            session, user.id, version
+        ):
+            user = None
     if not user:
-        raise credentials_exception
+        user = await session.scalar(
+            select(User)
+            .where(User.email == email, active_users())
+            # Overwrite a stale entry merged from the cache.
+            .execution_options(populate_existing=True)
+        )
+        if not user:
+            raise credentials_exception()
+        await user_cache.set(email, user)
 
+    if version is not None and version != user.token_version:
+        raise credentials_exception()
+    # The email may since belong to a new account.
+    if payload.get('uid', user.id) != user.id:
+        raise credentials_exception()
     return user
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    return await load_user(session, decode_access_token(token))
+
+
+async def get_current_principal(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    """The caller of routes that only need its id.
+
+    With `AUTH_STATELESS` the id comes from the token and the user row is
+    never loaded; revoked tokens are caught by `token_denylist`.
+    """
+    payload = decode_access_token(token)
+    if not settings.AUTH_STATELESS or 'uid' not in payload:
+        return await load_user(session, payload)
+
+    if await token_denylist.is_revoked(
+        session, payload['uid'], payload.get('ver', 0)
+    ):
+        raise credentials_exception()
+    return TokenUser(id=payload['uid'], email=payload['sub'])
+
+
+def utcnow():
+    return datetime.now(tz=ZoneInfo('UTC')).replace(tzinfo=None)
+
+
+def hash_refresh_token(token: str):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(
+    session: AsyncSession, user_id: int, family_id: str | None = None
+):
+    """Add a new refresh token to `session` and return its value.
+
+    Only the hash is stored. Without `family_id` the token starts a new
+    family, as on login.
+    """
+    token = secrets.token_urlsafe(32)
+    session.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or uuid.uuid4().hex,
+            expires_at=utcnow()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+async def rotate_refresh_token(session: AsyncSession, token: str):
+    """Spend `token` and return its user id and the replacement token.
+
+    A token that was already replaced is being reused, most likely
+    because it leaked, so its whole family is revoked.
+    """
+    now = utcnow()
+    token_hash = hash_refresh_token(token)
+    spent = (
+        await session.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.replaced_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(replaced_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+
+    if spent is None:
+        family_id = await session.scalar(
+            select(RefreshToken.family_id).where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.replaced_at.is_not(None),
+            )
+        )
+        if family_id:
+            await revoke_refresh_tokens(
+                session, RefreshToken.family_id == family_id
+            )
+            await session.commit()
+        raise credentials_exception()
+
+    return spent.user_id, issue_refresh_token(
+        session, spent.user_id, spent.family_id
+    )
+
+
+async def revoke_refresh_tokens(session: AsyncSession, *criteria):
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.revoked_at.is_(None), *criteria)
+        .values(revoked_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
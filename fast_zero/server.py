@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import uvicorn
+
+from fast_zero.settings import Settings
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        return os.cpu_count() or 1
+
+
+def worker_count(settings: Settings):
+    return settings.SERVER_WORKERS or available_cpus()
+
+
+def main():
+    settings = Settings()
+    workers = worker_count(settings)
+
+    # Workers are spawned and read their settings again; pin the resolved
+    # count so each one takes the same share of the database connections.
+    os.environ['SERVER_WORKERS'] = str(workers)
+    if (
+        workers > 1
+        and settings.METRICS_ENABLED
+        and 'PROMETHEUS_MULTIPROC_DIR' not in os.environ
+    ):
+        # Lets /metrics report every worker, not just the one scraped.
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(
+            prefix='fast_zero-metrics-'
+        )
+
+    uvicorn.run(
+        'fast_zero.app:app',
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,6 +10,55 @@ class Settings(BaseSettings):
         extra='ignore',
     )
     DATABASE_URL: str
+    DATABASE_POOL: Literal['queue', 'null'] = 'queue'
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_MAX_CONNECTIONS: int = 0
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    JWT_KEYS: dict[str, str] = {}
+    JWT_ACTIVE_KID: str | None = None
+    JWKS_MAX_AGE: int = 300
+    AUTH_STATELESS: bool = False
+    TOKEN_DENYLIST_REFRESH_SECONDS: int = 30
+    TOKEN_CACHE_MAXSIZE: int = 10_000
+    USER_CACHE_TTL: int = 60
+    USER_CACHE_MAXSIZE: int = 10_000
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_PENDING: int = 128
+    AUTH_IP_RATE_PER_MINUTE: int = 60
+    AUTH_IP_BURST: int = 20
+    LOGIN_USERNAME_RATE_PER_MINUTE: int = 10
+    LOGIN_USERNAME_BURST: int = 5
+    LOGIN_MAX_CONCURRENT_VERIFICATIONS: int = 0
+    LOGIN_VERIFICATION_TIMEOUT_SECONDS: float = 5
+    RATE_LIMIT_MAXSIZE: int = 100_000
+    EVENTS_FANOUT: bool = False
+    EVENTS_REPLAY_SIZE: int = 100
+    EVENTS_MAX_USERS: int = 10_000
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: float = 15
+    SYNC_OVERLAP_SECONDS: int = 10
+    SYNC_TOMBSTONE_DAYS: int = 30
+    PURGE_WORKER: bool = False
+    PURGE_TODOS_AFTER_SECONDS: int = 86_400
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_ROWS_PER_SECOND: float = 1000
+    PURGE_IDLE_SECONDS: float = 60
+    SERVER_HOST: str = '0.0.0.0'
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_LOOP: Literal['auto', 'asyncio', 'uvloop'] = 'auto'
+    SERVER_HTTP: Literal['auto', 'h11', 'httptools'] = 'auto'
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_FORWARDED_ALLOW_IPS: str = '127.0.0.1'
+    METRICS_ENABLED: bool = True
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import Todo, TodoTombstone, database_now, user_todos
+from fast_zero.pagination import decode_token, encode_token
+from fast_zero.responses import select_fields
+from fast_zero.schemas import TodoPulicSchema
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+# A position in a change feed: (timestamp, id) of the last row seen.
+Position = tuple[datetime, int]
+
+
+def encode_sync_token(todos: Position | None, deleted: Position) -> str:
+    return encode_token({
+        key: [position[0].isoformat(), position[1]] if position else None
+        for key, position in (('t', todos), ('d', deleted))
+    })
+
+
+def decode_sync_token(token: str):
+    invalid_token = HTTPException(
+        status_code=HTTPStatus.BAD_REQUEST,
+        detail='Invalid sync token',
+    )
+    try:
+        data = decode_token(token)
+        todos, deleted = (
+            (datetime.fromisoformat(data[key][0]), int(data[key][1]))
+            if data[key]
+            else None
+            for key in ('t', 'd')
+        )
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise invalid_token
+    if deleted is None:
+        raise invalid_token
+    return todos, deleted
+
+
+async def record_tombstones(session: AsyncSession, user_id: int, ids):
+    await session.execute(
+        insert(TodoTombstone),
+        [{'todo_id': id, 'user_id': user_id} for id in ids],
+    )
+
+
+async def todo_changes(
+    session: AsyncSession, user_id: int, since: str | None, limit: int
+):
+    """Todos written and deleted after the `since` token.
+
+    Timestamps are taken when a transaction starts, so a write can show up
+    behind a position already handed out. The final token of a sync is
+    therefore held `SYNC_OVERLAP_SECONDS` back, and clients see writes of
+    that window twice rather than miss a slow transaction's.
+
+    Tombstones are purged after `SYNC_TOMBSTONE_DAYS`, so older tokens are
+    rejected and the client has to sync from scratch.
+
+    Positions are read from the database's clock, which stamps the rows.
+    """
+    now = await session.scalar(select(database_now()))
+    cutoff = (now - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS), 0)
+    # A first sync has nothing to delete, only deletes made while it runs.
+    todos_from, deleted_from = (
+        decode_sync_token(since) if since else (None, cutoff)
+    )
+    if deleted_from[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Sync token expired',
+        )
+
+    columns = (Todo.updated_at, Todo.id)
+    query = (
+        select_fields(Todo, TodoPulicSchema)
+        .where(user_todos(user_id))
+        .order_by(*columns)
+        .limit(limit)
+    )
+    if todos_from:
+        query = query.where(tuple_(*columns) > tuple_(*todos_from))
+    todos = (await session.execute(query)).all()
+
+    columns = (TodoTombstone.deleted_at, TodoTombstone.todo_id)
+    deleted = (
+        await session.execute(
+            select(*columns)
+            .where(
+                TodoTombstone.user_id == user_id,
+                tuple_(*columns) > tuple_(*deleted_from),
+            )
+            .order_by(*columns)
+            .limit(limit)
+        )
+    ).all()
+
+    has_more = limit in {len(todos), len(deleted)}
+    todos_to = (todos[-1].updated_at, todos[-1].id) if todos else todos_from
+    deleted_to = tuple(deleted[-1]) if deleted else deleted_from
+    if not has_more:
+        # Everything up to now was returned, so the sync is caught up.
+        todos_to = deleted_to = cutoff
+
+    return {
+        'todos': [row._asdict() for row in todos],
+        'deleted': [row.todo_id for row in deleted],
+        'next_token': encode_sync_token(todos_to, deleted_to),
+        'has_more': has_more,
+    }
@@ -1,5 +1,6 @@
 from logging.config import fileConfig
 
+from sqlalchemy import Column
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -30,6 +31,17 @@ target_metadata = table_registry.metadata
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Postgres reflects expression indexes (e.g. the todos full-text index)
+    # in a normalised form that never matches the model, so autogenerate
+    # would drop and recreate them on every run.
+    if type_ == "index" and not all(
+        isinstance(expr, Column) for expr in object.expressions
+    ):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -46,6 +58,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +82,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,29 @@
+"""index refresh token expiry
+
+Revision ID: 5246311c6261
+Revises: 8734cb31db48
+Create Date: 2026-10-18 22:23:11.697172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5246311c6261'
+down_revision: Union[str, None] = '8734cb31db48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add created_at pagination indexes
+
+Revision ID: 8734cb31db48
+Revises: 3e72621dce13
+Create Date: 2026-10-18 21:56:29.958633
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8734cb31db48'
+down_revision: Union[str, None] = '3e72621dce13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_created_at_id', 'todos', ['user_id', 'created_at', 'id'], unique=False, postgresql_where=sa.text('deleted_at IS NULL'), postgresql_concurrently=True)
+        op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False, postgresql_where=sa.text('disabled_at IS NULL'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_created_at_id', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add todos user indexes
+
+Revision ID: b3f1c9d2a4e7
+Revises: 65a55dd7d150
+Create Date: 2024-08-02 14:21:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c9d2a4e7'
+down_revision: Union[str, None] = '65a55dd7d150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_id', 'todos', ['user_id', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_todos_user_id_state_id', 'todos', ['user_id', 'state', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_user_id_state_id', table_name='todos', postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_id', table_name='todos', postgresql_concurrently=True)
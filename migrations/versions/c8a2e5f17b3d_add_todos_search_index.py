@@ -0,0 +1,34 @@
+"""add todos search index
+
+Revision ID: c8a2e5f17b3d
+Revises: b3f1c9d2a4e7
+Create Date: 2024-08-05 09:47:12.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a2e5f17b3d'
+down_revision: Union[str, None] = 'b3f1c9d2a4e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_search', 'todos', [sa.text("to_tsvector('simple'::regconfig, title || ' ' || description)")], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_search', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""unique identifiers of active users only
+
+Revision ID: dcdd9b45c49e
+Revises: 5246311c6261
+Create Date: 2026-10-18 23:03:41.928261
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dcdd9b45c49e'
+down_revision: Union[str, None] = '5246311c6261'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build the partial indexes first so the identifiers are never
+    # without a unique check.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_email', 'users', ['email'], unique=True, postgresql_where=sa.text('disabled_at IS NULL'), postgresql_concurrently=True)
+        op.create_index('ix_users_username', 'users', ['username'], unique=True, postgresql_where=sa.text('disabled_at IS NULL'), postgresql_concurrently=True)
+    op.drop_constraint(op.f('users_email_key'), 'users', type_='unique')
+    op.drop_constraint(op.f('users_username_key'), 'users', type_='unique')
+
+
+def downgrade() -> None:
+    # Fails while a deleted account waiting for the purge shares an
+    # identifier with an active one.
+    op.create_unique_constraint(op.f('users_username_key'), 'users', ['username'])
+    op.create_unique_constraint(op.f('users_email_key'), 'users', ['email'])
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_username', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_email', table_name='users', postgresql_concurrently=True)
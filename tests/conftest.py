@@ -1,14 +1,22 @@
 import factory
 import factory.fuzzy
+import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from testcontainers.postgres import PostgresContainer
 
 from fast_zero.app import app
+from fast_zero.cache import token_cache, token_denylist, user_cache
 from fast_zero.database import get_session
+from fast_zero.events import todo_events
 from fast_zero.models import Todo, TodoState, User, table_registry
+from fast_zero.ratelimit import rate_limiter
 from fast_zero.security import get_password_hash
 
 
@@ -43,52 +51,76 @@ def client(session):
     app.dependency_overrides.clear()
 
 
+@pytest_asyncio.fixture()
+async def async_client(engine, session):
+    """A client whose requests each get their own session, so they can
+    run concurrently.
+    """
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_session_override():
+        async with sessionmaker() as db_session:
+            yield db_session
+
+    app.dependency_overrides[get_session] = get_session_override
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url='http://test'
+    ) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
-        _engine = create_engine(postgres.get_connection_url())
+        _engine = create_async_engine(postgres.get_connection_url())
+        yield _engine
 
-        with _engine.begin():
-            yield _engine
 
+@pytest_asyncio.fixture()
+async def session(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
 
-@pytest.fixture()
-def session(engine):
-    table_registry.metadata.create_all(engine)
-
-    with Session(engine) as session:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
-        session.rollback()
 
-    table_registry.metadata.drop_all(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
 
+    user_cache.backend.clear()
+    token_denylist.clear()
+    token_cache.clear()
+    rate_limiter.backend.clear()
+    todo_events.clear()
 
-@pytest.fixture()
-def user(session):
+
+@pytest_asyncio.fixture()
+async def user(session):
     pwd = 'testpassword'
 
     user = UserFactory(
         password=get_password_hash(pwd),
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     user.clean_password = pwd
 
     return user
 
 
-@pytest.fixture()
-def other_user(session):
+@pytest_asyncio.fixture()
+async def other_user(session):
     pwd = 'testpassword2'
 
     user = UserFactory(
         password=get_password_hash('testpassword2'),
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     user.clean_password = pwd
     return user
@@ -107,11 +139,11 @@ def token(client, user):
     return response.json().get('access_token')
 
 
-@pytest.fixture()
-def todo(session, user):
+@pytest_asyncio.fixture()
+async def todo(session, user):
     todo = TodoFactory(user_id=user.id, state=TodoState.todo)
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     return todo
@@ -1,6 +1,19 @@
 from http import HTTPStatus
 
+import pytest_asyncio
 from freezegun import freeze_time
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from fast_zero.security import pwd_context
+
+
+@pytest_asyncio.fixture()
+async def outdated_user(session, user):
+    weak = Argon2Hasher(time_cost=1, memory_cost=8192, parallelism=1)
+    user.password = weak.hash(user.clean_password)
+    await session.commit()
+
+    return user
 
 
 def test_token(client, user):
@@ -17,6 +30,35 @@ def test_token(client, user):
     assert response.json().get('token_type') == 'bearer'
 
 
+def test_token_rehashes_outdated_password(client, outdated_user):
+    outdated_hash = outdated_user.password
+
+    response = client.post(
+        '/auth/token/',
+        data={
+            'username': outdated_user.email,
+            'password': outdated_user.clean_password,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert outdated_user.password != outdated_hash
+    assert not pwd_context.current_hasher.check_needs_rehash(
+        outdated_user.password
+    )
+
+
+def test_token_keeps_current_hash(client, user):
+    current_hash = user.password
+
+    client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert user.password == current_hash
+
+
 def test_token__user_not_found(client):
     response = client.post(
         '/auth/token/',
@@ -135,3 +177,102 @@ def test_refresh_token__expired_token(client, user):
 
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def login(client, user):
+    return client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()
+
+
+def test_token_returns_refresh_token(client, user):
+    assert login(client, user).get('refresh_token')
+
+
+def test_rotate_refresh_token(client, user):
+    refresh_token = login(client, user)['refresh_token']
+
+    response = client.post(
+        '/auth/token/refresh/', json={'refresh_token': refresh_token}
+    )
+
+    data = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert data['token_type'] == 'bearer'
+    assert data['refresh_token'] != refresh_token
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {data["access_token"]}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_rotate_refresh_token__unknown_token(client):
+    response = client.post(
+        '/auth/token/refresh/', json={'refresh_token': 'invalid'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_rotate_refresh_token__reuse_revokes_family(client, user):
+    first = login(client, user)['refresh_token']
+    second = client.post(
+        '/auth/token/refresh/', json={'refresh_token': first}
+    ).json()['refresh_token']
+
+    reused = client.post('/auth/token/refresh/', json={'refresh_token': first})
+    response = client.post(
+        '/auth/token/refresh/', json={'refresh_token': second}
+    )
+
+    assert reused.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_rotate_refresh_token__other_families_survive_reuse(client, user):
+    first = login(client, user)['refresh_token']
+    other = login(client, user)['refresh_token']
+    client.post('/auth/token/refresh/', json={'refresh_token': first})
+    client.post('/auth/token/refresh/', json={'refresh_token': first})
+
+    response = client.post(
+        '/auth/token/refresh/', json={'refresh_token': other}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_rotate_refresh_token__expired(client, user):
+    with freeze_time('2021-01-01 12:00:00'):
+        refresh_token = login(client, user)['refresh_token']
+
+    with freeze_time('2021-03-01 12:00:00'):
+        response = client.post(
+            '/auth/token/refresh/', json={'refresh_token': refresh_token}
+        )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_rotate_refresh_token__revoked_on_user_update(client, user):
+    data = login(client, user)
+
+    updated = client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {data["access_token"]}'},
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'new-password',
+        },
+    )
+    response = client.post(
+        '/auth/token/refresh/', json={'refresh_token': data['refresh_token']}
+    )
+
+    assert updated.status_code == HTTPStatus.OK
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
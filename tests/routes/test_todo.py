@@ -1,10 +1,18 @@
+import asyncio
+from datetime import timedelta
 from http import HTTPStatus
 
-from sqlalchemy import select
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import sqlite
 
-from fast_zero.models import Todo
+from fast_zero.models import Todo, TodoActivity, TodoState, user_todos
+from fast_zero.routes.todos import search_todos
+from fast_zero.schemas import TodoPulicSchema
 from tests.conftest import TodoFactory
 
+TODO = {'title': 'title', 'description': 'description', 'state': 'todo'}
+
 
 def test_create_todo(client, token):
     response = client.post(
@@ -25,12 +33,11 @@ def test_create_todo(client, token):
     assert response.json().get('created_at') is not None
 
 
-def test_read_todos_should_return_5_todos(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_read_todos_should_return_5_todos(session, client, token, user):
     expected_todos = 5
-    session.bulk_save_objects(
-        TodoFactory.create_batch(expected_todos, user_id=user.id)
-    )
-    session.commit()
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -40,12 +47,13 @@ def test_read_todos_should_return_5_todos(session, client, token, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_should_return_15_todo(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_read_todos_should_return_15_todo(session, client, token, user):
     expected_todos = 15
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(expected_todos * 2, user_id=user.id)
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -56,17 +64,34 @@ def test_read_todos_should_return_15_todo(session, client, token, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_title(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_read_todos_matches_public_schema(session, client, token, todo):
+    await session.refresh(todo)
+    expected = TodoPulicSchema.model_validate(
+        todo, from_attributes=True
+    ).model_dump(mode='json')
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json()['todos'] == [expected]
+
+
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_title(session, client, token, user):
     expected_todos = 5
     title = 'title'
     title2 = 'word'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(expected_todos, user_id=user.id, title=title)
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(expected_todos, user_id=user.id, title=title2)
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -77,21 +102,22 @@ def test_read_todos_filter_by_title(session, client, token, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_description(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_description(session, client, token, user):
     expected_todos = 5
     description = 'description'
     description2 = 'word'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos, user_id=user.id, description=description
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos, user_id=user.id, description=description2
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -102,17 +128,18 @@ def test_read_todos_filter_by_description(session, client, token, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_state(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_state(session, client, token, user):
     expected_todos = 5
     state = 'todo'
     state2 = 'done'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(expected_todos, user_id=user.id, state=state)
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(expected_todos, user_id=user.id, state=state2)
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -123,7 +150,8 @@ def test_read_todos_filter_by_state(session, client, token, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_title_and_description(
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_title_and_description(
     session, client, token, user
 ):
     expected_todos = 5
@@ -131,7 +159,7 @@ def test_read_todos_filter_by_title_and_description(
     description = 'description'
     title2 = 'word'
     description2 = 'word'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -139,7 +167,7 @@ def test_read_todos_filter_by_title_and_description(
             description=description,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -147,7 +175,7 @@ def test_read_todos_filter_by_title_and_description(
             description=description2,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -159,7 +187,8 @@ def test_read_todos_filter_by_title_and_description(
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_title_and_description_negative(
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_title_and_description_negative(
     session, client, token, user
 ):
     expected_todos = 5
@@ -167,7 +196,7 @@ def test_read_todos_filter_by_title_and_description_negative(
     description = 'description'
     title2 = 'word'
     description2 = 'word'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -175,7 +204,7 @@ def test_read_todos_filter_by_title_and_description_negative(
             description=description,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -183,7 +212,7 @@ def test_read_todos_filter_by_title_and_description_negative(
             description=description2,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -195,13 +224,16 @@ def test_read_todos_filter_by_title_and_description_negative(
     assert len(response.json()['todos']) == 0
 
 
-def test_read_todos_filter_by_title_and_state(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_title_and_state(
+    session, client, token, user
+):
     expected_todos = 5
     title = 'title'
     state = 'todo'
     title2 = 'word'
     state2 = 'done'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -209,7 +241,7 @@ def test_read_todos_filter_by_title_and_state(session, client, token, user):
             state=state,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -217,7 +249,7 @@ def test_read_todos_filter_by_title_and_state(session, client, token, user):
             state=state2,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -228,7 +260,8 @@ def test_read_todos_filter_by_title_and_state(session, client, token, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_title_and_state_negative(
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_title_and_state_negative(
     session, client, token, user
 ):
     expected_todos = 5
@@ -236,7 +269,7 @@ def test_read_todos_filter_by_title_and_state_negative(
     state = 'todo'
     title2 = 'word'
     state2 = 'done'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -244,7 +277,7 @@ def test_read_todos_filter_by_title_and_state_negative(
             state=state,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -252,7 +285,7 @@ def test_read_todos_filter_by_title_and_state_negative(
             state=state2,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -264,7 +297,8 @@ def test_read_todos_filter_by_title_and_state_negative(
     assert len(response.json()['todos']) == 0
 
 
-def test_read_todos_filter_by_description_and_state(
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_description_and_state(
     session, client, token, user
 ):
     expected_todos = 5
@@ -272,7 +306,7 @@ def test_read_todos_filter_by_description_and_state(
     state = 'todo'
     description2 = 'word'
     state2 = 'done'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -280,7 +314,7 @@ def test_read_todos_filter_by_description_and_state(
             state=state,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -288,7 +322,7 @@ def test_read_todos_filter_by_description_and_state(
             state=state2,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -299,7 +333,8 @@ def test_read_todos_filter_by_description_and_state(
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_read_todos_filter_by_description_and_state_negative(
+@pytest.mark.asyncio()
+async def test_read_todos_filter_by_description_and_state_negative(
     session, client, token, user
 ):
     expected_todos = 5
@@ -307,7 +342,7 @@ def test_read_todos_filter_by_description_and_state_negative(
     state = 'todo'
     description2 = 'word'
     state2 = 'done'
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -315,7 +350,7 @@ def test_read_todos_filter_by_description_and_state_negative(
             state=state,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             expected_todos,
             user_id=user.id,
@@ -323,7 +358,7 @@ def test_read_todos_filter_by_description_and_state_negative(
             state=state2,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -335,10 +370,11 @@ def test_read_todos_filter_by_description_and_state_negative(
     assert len(response.json()['todos']) == 0
 
 
-def test_delete_todo_should_delete(session, client, token, user):
+@pytest.mark.asyncio()
+async def test_delete_todo_should_delete(session, client, token, user):
     todo = TodoFactory(user_id=user.id)
     session.add(todo)
-    session.commit()
+    await session.commit()
 
     response = client.delete(
         f'/todos/{todo.id}',
@@ -350,11 +386,13 @@ def test_delete_todo_should_delete(session, client, token, user):
         'message': 'Task has been deleted successfully.',
     }
     assert (
-        session.scalar(
-            select(Todo).where(Todo.user_id == user.id, Todo.id == todo.id)
+        await session.scalar(
+            select(Todo).where(user_todos(user.id), Todo.id == todo.id)
         )
         is None
     )
+    await session.refresh(todo)
+    assert todo.deleted_at is not None
 
 
 def test_delete_todo_should_return_not_found(session, client, token, user):
@@ -367,6 +405,16 @@ def test_delete_todo_should_return_not_found(session, client, token, user):
     assert response.json() == {'detail': 'Task not found.'}
 
 
+def test_deleted_todo_is_gone(client, token, todo):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/todos/{todo.id}', headers=headers)
+
+    response = client.delete(f'/todos/{todo.id}', headers=headers)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert client.get('/todos/', headers=headers).json()['todos'] == []
+
+
 def test_delete_todo_should_return_unauthorized(session, client):
     response = client.delete('/todos/1')
 
@@ -538,12 +586,13 @@ def test_todo_update_should_return_unauthorized(session, client):
     assert response.json() == {'detail': 'Not authenticated'}
 
 
-def test_todo_update_should_return_not_found_for_other_user_todo(
+@pytest.mark.asyncio()
+async def test_todo_update_should_return_not_found_for_other_user_todo(
     session, client, token, other_user
 ):
     todo = TodoFactory(user_id=other_user.id)
     session.add(todo)
-    session.commit()
+    await session.commit()
 
     response = client.patch(
         f'/todos/{todo.id}',
@@ -557,3 +606,486 @@ def test_todo_update_should_return_not_found_for_other_user_todo(
 
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'Task not found.'}
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize('order_by', ['id', 'created_at'])
+async def test_read_todos_cursor_pagination(
+    session, client, token, user, order_by
+):
+    expected_todos = 25
+    expected_pages = 3
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    await session.commit()
+
+    ids = []
+    pages = 0
+    params = {'limit': 10, 'order_by': order_by}
+    while True:
+        response = client.get(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+            params=params,
+        )
+        assert response.status_code == HTTPStatus.OK
+        pages += 1
+        ids.extend(todo['id'] for todo in response.json()['todos'])
+        if not response.json()['next_cursor']:
+            break
+        params['cursor'] = response.json()['next_cursor']
+
+    assert pages == expected_pages
+    assert ids == sorted(ids)
+    assert len(set(ids)) == expected_todos
+
+
+def test_read_todos_invalid_cursor(client, token):
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'cursor': 'not-a-cursor'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+@pytest.mark.asyncio()
+async def test_read_todos_cursor_from_other_order(
+    session, client, token, user
+):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'limit': 1},
+    )
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={
+            'cursor': response.json()['next_cursor'],
+            'order_by': 'created_at',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_read_todos_search(session, client, token, user):
+    expected_todos = 4
+    session.add_all(
+        TodoFactory.create_batch(
+            2, user_id=user.id, title='buy milk', description='at the shop'
+        )
+    )
+    session.add_all(
+        TodoFactory.create_batch(
+            2, user_id=user.id, title='errands', description='Milk and eggs'
+        )
+    )
+    session.add_all(
+        TodoFactory.create_batch(
+            3, user_id=user.id, title='buy bread', description='bakery'
+        )
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'q': 'milk'},
+    )
+
+    assert len(response.json()['todos']) == expected_todos
+
+
+@pytest.mark.asyncio()
+async def test_read_todos_search_all_words(session, client, token, user):
+    expected_todos = 2
+    session.add_all(
+        TodoFactory.create_batch(
+            2, user_id=user.id, title='buy milk', description='at the shop'
+        )
+    )
+    session.add_all(
+        TodoFactory.create_batch(
+            3, user_id=user.id, title='buy bread', description='bakery'
+        )
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'q': 'buy shop'},
+    )
+
+    assert len(response.json()['todos']) == expected_todos
+
+
+def test_search_todos_falls_back_to_like():
+    sql = str(
+        search_todos('50%_off', 'sqlite').compile(
+            dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}
+        )
+    )
+
+    assert "lower(todos.title) LIKE lower('%50\\%\\_off%') ESCAPE" in sql
+
+
+def test_create_todos_bulk(client, token):
+    todos = [
+        {'title': f'title {i}', 'description': 'description', 'state': 'todo'}
+        for i in range(3)
+    ]
+
+    response = client.post(
+        '/todos/bulk',
+        json=todos,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    results = response.json()['results']
+    assert response.status_code == HTTPStatus.CREATED
+    assert [r['status'] for r in results] == [HTTPStatus.CREATED] * 3
+    assert [r['todo']['title'] for r in results] == [
+        'title 0',
+        'title 1',
+        'title 2',
+    ]
+    assert all(r['todo']['created_at'] for r in results)
+
+
+def test_create_todos_bulk__too_many_items(client, token):
+    todos = [{'title': 't', 'description': 'd', 'state': 'todo'}] * 1001
+
+    response = client.post(
+        '/todos/bulk',
+        json=todos,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio()
+async def test_update_todos_bulk(session, client, token, user, other_user):
+    mine = TodoFactory.create_batch(2, user_id=user.id, state='todo')
+    theirs = TodoFactory(user_id=other_user.id, state='todo')
+    session.add_all([*mine, theirs])
+    await session.commit()
+
+    response = client.patch(
+        '/todos/bulk',
+        json=[
+            {'id': mine[0].id, 'state': 'done'},
+            {'id': mine[1].id, 'title': 'new title'},
+            {'id': theirs.id, 'state': 'done'},
+            {'id': 999},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    results = response.json()['results']
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status'] for r in results] == [
+        HTTPStatus.OK,
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.NOT_FOUND,
+    ]
+    assert results[0]['todo']['state'] == 'done'
+    assert results[1]['todo']['title'] == 'new title'
+    assert results[1]['todo']['state'] == 'todo'
+
+    await session.refresh(theirs)
+    assert theirs.state == 'todo'
+
+
+def test_update_todos_bulk_without_changes_writes_nothing(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = client.post('/todos/', headers=headers, json=TODO).json()
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    response = client.patch(
+        '/todos/bulk',
+        headers=headers,
+        json=[{'id': todo['id'], 'title': TODO['title']}],
+    )
+    not_modified = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.json()['results'][0]['todo'] == todo
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_bulk_updates_keep_the_counters(token, async_client):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = (
+        await async_client.post('/todos/', headers=headers, json=TODO)
+    ).json()
+
+    await asyncio.gather(
+        *(
+            async_client.patch(
+                '/todos/bulk',
+                headers=headers,
+                json=[{'id': todo['id'], 'state': state}],
+            )
+            for state in ('doing', 'done')
+        )
+    )
+
+    stats = (await async_client.get('/todos/stats', headers=headers)).json()
+    assert stats['total'] == 1
+    assert sorted(stats['states'].values()) == [0, 0, 0, 0, 1]
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_updates_keep_the_counters(token, async_client):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = (
+        await async_client.post('/todos/', headers=headers, json=TODO)
+    ).json()
+
+    await asyncio.gather(
+        *(
+            async_client.patch(
+                f'/todos/{todo["id"]}', headers=headers, json={'state': state}
+            )
+            for state in ('doing', 'done')
+        )
+    )
+
+    stats = (await async_client.get('/todos/stats', headers=headers)).json()
+    assert stats['total'] == 1
+    assert sorted(stats['states'].values()) == [0, 0, 0, 0, 1]
+
+
+@pytest.mark.asyncio()
+async def test_delete_todos_bulk(session, client, token, user, other_user):
+    mine = TodoFactory.create_batch(2, user_id=user.id)
+    theirs = TodoFactory(user_id=other_user.id)
+    session.add_all([*mine, theirs])
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/bulk',
+        json=[mine[0].id, theirs.id, mine[1].id],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['results'] == [
+        {'id': mine[0].id, 'status': 200, 'todo': None, 'detail': None},
+        {
+            'id': theirs.id,
+            'status': 404,
+            'todo': None,
+            'detail': 'Task not found.',
+        },
+        {'id': mine[1].id, 'status': 200, 'todo': None, 'detail': None},
+    ]
+    remaining = await session.scalars(
+        select(Todo.id).where(Todo.deleted_at.is_(None))
+    )
+    assert list(remaining) == [theirs.id]
+
+
+def test_read_todos_not_modified(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert not response.content
+
+
+def test_read_todos_etag_depends_on_query(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/', headers=headers).headers['etag']
+    filtered = client.get(
+        '/todos/', headers=headers, params={'state': 'done'}
+    ).headers['etag']
+
+    assert first != filtered
+
+
+# name -> (method, path, request kwargs) for a write to the todo `id`.
+WRITES = {
+    'create': lambda id: ('POST', '/todos/', {'json': TODO}),
+    'create_bulk': lambda id: ('POST', '/todos/bulk', {'json': [TODO]}),
+    'update': lambda id: ('PATCH', f'/todos/{id}', {'json': {'title': 'x'}}),
+    'update_bulk': lambda id: (
+        'PATCH',
+        '/todos/bulk',
+        {'json': [{'id': id, 'title': 'x'}]},
+    ),
+    'delete': lambda id: ('DELETE', f'/todos/{id}', {}),
+    'delete_bulk': lambda id: ('DELETE', '/todos/bulk', {'json': [id]}),
+}
+
+
+@pytest.mark.parametrize('write', WRITES)
+def test_read_todos_etag_changes_on_write(client, token, write):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo_id = client.post('/todos/', headers=headers, json=TODO).json()['id']
+    etag = client.get('/todos/', headers=headers).headers['etag']
+    method, path, kwargs = WRITES[write](todo_id)
+
+    client.request(method, path, headers=headers, **kwargs).raise_for_status()
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+
+
+@pytest.mark.parametrize('body', [{}, {'title': TODO['title']}])
+def test_todo_update_without_changes_writes_nothing(client, token, body):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post('/todos/', headers=headers, json=TODO)
+    todo_id, todo_etag = response.json()['id'], response.headers['etag']
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    response = client.patch(f'/todos/{todo_id}', headers=headers, json=body)
+    not_modified = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] == todo_etag
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_todo_update_if_match(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post('/todos/', headers=headers, json=TODO)
+    todo_id, etag = response.json()['id'], response.headers['etag']
+
+    updated = client.patch(
+        f'/todos/{todo_id}',
+        headers={**headers, 'If-Match': etag},
+        json={'title': 'first'},
+    )
+    stale = client.patch(
+        f'/todos/{todo_id}',
+        headers={**headers, 'If-Match': etag},
+        json={'title': 'second'},
+    )
+
+    assert updated.status_code == HTTPStatus.OK
+    assert updated.headers['etag'] != etag
+    assert stale.status_code == HTTPStatus.PRECONDITION_FAILED
+    assert stale.json() == {'detail': 'Task has been modified.'}
+
+
+def test_read_todo_stats_without_todos(client, token):
+    response = client.get(
+        '/todos/stats', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'total': 0,
+        'states': {state.value: 0 for state in TodoState},
+        'last_activity_at': None,
+        'recent': {'days': 7, 'created': 0, 'completed': 0, 'deleted': 0},
+    }
+
+
+@pytest.mark.asyncio()
+async def test_read_todo_stats_follows_writes(session, client, token, user):
+    headers = {'Authorization': f'Bearer {token}'}
+    ids = [
+        client.post('/todos/', headers=headers, json=TODO).json()['id']
+        for _ in range(3)
+    ]
+    drafts = [
+        result['id']
+        for result in client.post(
+            '/todos/bulk',
+            headers=headers,
+            json=[{**TODO, 'state': 'draft'}] * 3,
+        ).json()['results']
+    ]
+    client.patch(f'/todos/{ids[0]}', headers=headers, json={'state': 'done'})
+    client.patch(
+        '/todos/bulk',
+        headers=headers,
+        json=[
+            {'id': drafts[0], 'state': 'doing'},
+            {'id': drafts[0], 'state': 'done'},
+        ],
+    )
+    client.delete(f'/todos/{ids[1]}', headers=headers)
+    client.request('DELETE', '/todos/bulk', headers=headers, json=[drafts[1]])
+
+    stats = client.get('/todos/stats', headers=headers).json()
+
+    counts = dict(
+        (
+            await session.execute(
+                select(Todo.state, func.count())
+                .where(user_todos(user.id))
+                .group_by(Todo.state)
+            )
+        ).all()
+    )
+    assert stats['states'] == {
+        state.value: counts.get(state, 0) for state in TodoState
+    }
+    assert stats['total'] == sum(counts.values())
+    assert stats['last_activity_at'] is not None
+    assert stats['recent'] == {
+        'days': 7,
+        'created': 6,
+        'completed': 2,
+        'deleted': 2,
+    }
+
+
+def test_read_todo_stats_follow_the_database_clock(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = client.post('/todos/', headers=headers, json=TODO).json()
+
+    stats = client.get('/todos/stats', headers=headers).json()
+
+    # Stamped by the same transaction, with the same clock.
+    assert stats['last_activity_at'] == todo['created_at']
+
+
+@pytest.mark.asyncio()
+async def test_read_todo_stats_recent_window(session, client, token, user):
+    total = 2
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/todos/', headers=headers, json=TODO)
+    await session.execute(
+        update(TodoActivity)
+        .where(TodoActivity.user_id == user.id)
+        .values(day=TodoActivity.day - timedelta(days=10))
+    )
+    await session.commit()
+    client.post('/todos/', headers=headers, json=TODO)
+
+    week = client.get('/todos/stats', headers=headers).json()
+    month = client.get(
+        '/todos/stats', headers=headers, params={'days': 30}
+    ).json()
+
+    assert week['total'] == month['total'] == total
+    assert week['recent']['created'] == 1
+    assert month['recent']['created'] == total
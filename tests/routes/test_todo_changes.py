@@ -0,0 +1,147 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from fast_zero import sync
+from fast_zero.app import app
+from fast_zero.database import get_session
+from fast_zero.security import utcnow
+from tests.conftest import TodoFactory
+
+
+@pytest.fixture()
+def _no_overlap(monkeypatch):
+    monkeypatch.setattr(sync.settings, 'SYNC_OVERLAP_SECONDS', 0)
+
+
+def changes(client, token, **params):
+    response = client.get(
+        '/todos/changes',
+        headers={'Authorization': f'Bearer {token}'},
+        params=params,
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+@pytest.mark.asyncio()
+async def test_first_sync_returns_all_todos(
+    session, client, token, user, other_user
+):
+    expected_todos = 3
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    data = changes(client, token)
+
+    assert len(data['todos']) == expected_todos
+    assert data['deleted'] == []
+    assert data['has_more'] is False
+
+
+@pytest.mark.asyncio()
+async def test_sync_pages_with_next_token(session, client, token, user):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    limit = 2
+
+    first = changes(client, token, limit=limit)
+    second = changes(client, token, limit=limit, since=first['next_token'])
+
+    assert first['has_more'] is True
+    assert second['has_more'] is False
+    ids = [todo['id'] for todo in first['todos'] + second['todos']]
+    assert sorted(ids) == [1, 2, 3]
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('_no_overlap')
+async def test_sync_returns_only_changes_since_token(session, client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Test todo', 'description': 'Test', 'state': 'draft'}
+    ids = [
+        client.post('/todos/', json=todo, headers=headers).json()['id']
+        for _ in range(4)
+    ]
+    since = changes(client, token)['next_token']
+    # The requests share the test session: end the sync's transaction, or
+    # the writes below would be stamped with its start time.
+    await session.rollback()
+
+    client.patch(f'/todos/{ids[0]}', json={'state': 'done'}, headers=headers)
+    client.patch(
+        '/todos/bulk', json=[{'id': ids[1], 'title': 'x'}], headers=headers
+    )
+    client.delete(f'/todos/{ids[2]}', headers=headers)
+    client.request('DELETE', '/todos/bulk', json=[ids[3]], headers=headers)
+    data = changes(client, token, since=since)
+
+    assert sorted(todo['id'] for todo in data['todos']) == ids[:2]
+    assert sorted(data['deleted']) == ids[2:]
+    assert changes(client, token, since=data['next_token'])['todos'] == []
+
+
+@pytest.mark.asyncio()
+async def test_sync_token_overlaps_recent_writes(session, client, token, user):
+    session.add(TodoFactory(user_id=user.id))
+    await session.commit()
+
+    since = changes(client, token)['next_token']
+
+    assert len(changes(client, token, since=since)['todos']) == 1
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('session')
+async def test_sync_positions_follow_the_database_clock(engine, client, token):
+    # The rows are stamped in the database's time zone, not in UTC.
+    local_engine = create_async_engine(
+        engine.url, connect_args={'options': '-c timezone=Etc/GMT+3'}
+    )
+    sessionmaker = async_sessionmaker(local_engine, expire_on_commit=False)
+
+    async def get_session_override():
+        async with sessionmaker() as db_session:
+            yield db_session
+
+    app.dependency_overrides[get_session] = get_session_override
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Test todo', 'description': 'Test', 'state': 'draft'}
+    client.post('/todos/', json=todo, headers=headers)
+    since = changes(client, token)['next_token']
+
+    todo_id = client.post('/todos/', json=todo, headers=headers).json()['id']
+    data = changes(client, token, since=since)
+    await local_engine.dispose()
+
+    assert todo_id in [todo['id'] for todo in data['todos']]
+
+
+def test_sync_invalid_token(client, token):
+    response = client.get(
+        '/todos/changes',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'since': 'not-a-token'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid sync token'}
+
+
+def test_sync_expired_token(client, token):
+    position = (
+        utcnow() - timedelta(days=sync.settings.SYNC_TOMBSTONE_DAYS + 1),
+        0,
+    )
+
+    response = client.get(
+        '/todos/changes',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'since': sync.encode_sync_token(position, position)},
+    )
+
+    assert response.status_code == HTTPStatus.GONE
+    assert response.json() == {'detail': 'Sync token expired'}
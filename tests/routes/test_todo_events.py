@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from fast_zero.app import app
+from fast_zero.routes.todos import stream_todo_events
+
+TODO = {'title': 'Test todo', 'description': 'Test', 'state': 'draft'}
+
+
+def parse(message):
+    fields = dict(line.split(': ', 1) for line in message.split('\n') if line)
+    return int(fields['id']), fields['event'], json.loads(fields['data'])
+
+
+async def subscribe(user, session, last_event_id=None):
+    """Open the stream and wait until it is subscribed to the bus."""
+    response = await stream_todo_events(user, session, last_event_id)
+    events = response.body_iterator
+    first = asyncio.ensure_future(anext(events))
+    await asyncio.sleep(0)
+    return response, events, first
+
+
+@pytest_asyncio.fixture()
+async def async_client(client, token):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url='http://test',
+        headers={'Authorization': f'Bearer {token}'},
+    ) as async_client:
+        yield async_client
+
+
+@pytest.mark.asyncio()
+async def test_todo_events_stream_writes(session, user, async_client):
+    response, events, first = await subscribe(user, session)
+    assert response.media_type == 'text/event-stream'
+    assert response.headers['cache-control'] == 'no-cache'
+
+    todo_id = (await async_client.post('/todos/', json=TODO)).json()['id']
+    assert parse(await first) == (
+        1,
+        'created',
+        {'todos': [(await async_client.get('/todos/')).json()['todos'][0]]},
+    )
+
+    await async_client.patch(f'/todos/{todo_id}', json={'state': 'done'})
+    event_id, event, data = parse(await anext(events))
+    assert (event_id, event) == (2, 'updated')
+    assert data['todos'][0]['state'] == 'done'
+
+    await async_client.delete(f'/todos/{todo_id}')
+    assert parse(await anext(events)) == (3, 'deleted', {'ids': [todo_id]})
+    await events.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_todo_events_stream_bulk_writes(session, user, async_client):
+    _, events, first = await subscribe(user, session)
+
+    created = await async_client.post('/todos/bulk', json=[TODO, TODO])
+    ids = [result['id'] for result in created.json()['results']]
+    event_id, event, data = parse(await first)
+    assert (event_id, event) == (1, 'created')
+    assert [todo['id'] for todo in data['todos']] == ids
+
+    await async_client.patch(
+        '/todos/bulk', json=[{'id': ids[0], 'title': 'Renamed'}]
+    )
+    event_id, event, data = parse(await anext(events))
+    assert (event_id, event) == (2, 'updated')
+    assert [todo['title'] for todo in data['todos']] == ['Renamed']
+
+    await async_client.request('DELETE', '/todos/bulk', json=ids)
+    event_id, event, data = parse(await anext(events))
+    assert (event_id, event) == (3, 'deleted')
+    assert sorted(data['ids']) == ids
+    await events.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_todo_events_resume_from_last_event_id(
+    session, user, async_client
+):
+    _, events, first = await subscribe(user, session)
+    await async_client.post('/todos/', json=TODO)
+    await async_client.post('/todos/', json=TODO)
+    await first
+    await anext(events)
+    await events.aclose()
+
+    _, events, first = await subscribe(user, session, last_event_id=1)
+    event_id, event, _ = parse(await first)
+    assert (event_id, event) == (2, 'created')
+    await events.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_todo_events_reset_when_events_were_lost(
+    session, user, async_client
+):
+    await async_client.post('/todos/', json=TODO)
+
+    _, events, first = await subscribe(user, session, last_event_id=0)
+    assert parse(await first) == (1, 'reset', {})
+    await events.aclose()
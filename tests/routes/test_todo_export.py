@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import resource
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import text
+
+from fast_zero.routes.todos import export_todos
+from tests.conftest import TodoFactory
+
+
+@pytest.mark.asyncio()
+async def test_export_todos_ndjson(session, client, token, user, other_user):
+    expected_todos = 3
+    session.add_all(TodoFactory.create_batch(expected_todos, user_id=user.id))
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    todos = [json.loads(line) for line in response.text.splitlines()]
+    assert len(todos) == expected_todos
+    assert set(todos[0]) == {
+        'id',
+        'title',
+        'description',
+        'state',
+        'created_at',
+        'updated_at',
+    }
+
+
+@pytest.mark.asyncio()
+async def test_export_todos_csv(session, client, token, user):
+    expected_todos = 3
+    session.add_all(
+        TodoFactory.create_batch(expected_todos, user_id=user.id, state='done')
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/export',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'format': 'csv'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == expected_todos
+    assert {row['state'] for row in rows} == {'done'}
+
+
+@pytest.mark.slow()
+@pytest.mark.asyncio()
+async def test_export_todos_memory_is_constant(session, user):
+    expected_todos = 1_000_000
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, state, user_id) '
+            "SELECT 'title ' || n, 'description', 'todo', :user_id "
+            'FROM generate_series(1, :count) AS n'
+        ),
+        {'user_id': user.id, 'count': expected_todos},
+    )
+    await session.commit()
+
+    response = await export_todos(user=user, session=session)
+
+    lines = 0
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    async for chunk in response.body_iterator:
+        lines += chunk.count(b'\n')
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    assert lines == expected_todos
+    # ru_maxrss is in KiB; buffering 1M rows would grow it by hundreds of MiB
+    assert rss_after - rss_before < 50 * 1024
@@ -1,5 +1,8 @@
 from http import HTTPStatus
 
+import pytest
+
+from fast_zero.models import AccountDeletion
 from fast_zero.schemas import UserPublicSchema
 
 
@@ -52,7 +55,7 @@ def test_read_users(client):
     response = client.get('/users/')
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
 
 
 def test_read_users_with_user(client, user, other_user):
@@ -63,7 +66,23 @@ def test_read_users_with_user(client, user, other_user):
     response = client.get('/users/')
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema, other_user_schema]}
+    assert response.json() == {
+        'users': [user_schema, other_user_schema],
+        'next_cursor': None,
+    }
+
+
+def test_read_users_cursor_pagination(client, user, other_user):
+    response = client.get('/users/', params={'limit': 1})
+    first_page = response.json()
+
+    response = client.get(
+        '/users/', params={'limit': 1, 'cursor': first_page['next_cursor']}
+    )
+    second_page = response.json()
+
+    assert [u['id'] for u in first_page['users']] == [user.id]
+    assert [u['id'] for u in second_page['users']] == [other_user.id]
 
 
 def test_get_user(client):
@@ -173,6 +192,54 @@ def test_delete_user(client, user, token):
     assert response.json() == {'message': 'User deleted'}
 
 
+@pytest.mark.asyncio()
+async def test_delete_user_disables_account(session, client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    assert client.get('/todos/', headers=headers).status_code == (
+        HTTPStatus.UNAUTHORIZED
+    )
+    login = client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    assert login.status_code == HTTPStatus.BAD_REQUEST
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+    assert client.get('/users/').json()['users'] == []
+
+    await session.refresh(user)
+    assert user.disabled_at is not None
+    deletion = await session.get(AccountDeletion, user.id)
+    assert deletion.finished_at is None
+
+
+def test_deleted_account_identifiers_can_be_reused(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.post(
+        '/users/',
+        json={
+            'email': user.email,
+            'password': 'new-password',
+            'username': user.username,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['id'] != user.id
+    login = client.post(
+        '/auth/token/',
+        data={'username': user.email, 'password': 'new-password'},
+    )
+    assert login.status_code == HTTPStatus.OK
+    # Tokens of the deleted account don't carry over to the new one.
+    assert client.get('/todos/', headers=headers).status_code == (
+        HTTPStatus.UNAUTHORIZED
+    )
+
+
 def test_delete_user__user_is_not_the_owner_of_the_user(
     client, other_user, token
 ):
@@ -182,3 +249,38 @@ def test_delete_user__user_is_not_the_owner_of_the_user(
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permission'}
+
+
+def test_get_user_not_modified(client, user):
+    etag = client.get(f'/users/{user.id}').headers['etag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+
+
+def test_get_user_etag_changes_on_update(client, user, token):
+    etag = client.get(f'/users/{user.id}').headers['etag']
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'email': 'email2@email.com',
+            'username': 'username',
+            'password': user.clean_password,
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'username'
+
+
+def test_read_users_not_modified(client, user):
+    etag = client.get('/users/').headers['etag']
+
+    response = client.get('/users/', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
@@ -5,3 +5,12 @@ def test_read_root_deve_retornar_ok_e_olar_mundo(client):
     response = client.get('/')
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Olar mundo!'}
+
+
+def test_read_stats_includes_database_pool(client):
+    response = client.get('/stats/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert {'checkouts', 'timeouts', 'wait_seconds_max', 'checked_out'} <= (
+        response.json()['database_pool'].keys()
+    )
@@ -0,0 +1,184 @@
+from http import HTTPStatus
+
+import pytest
+from freezegun import freeze_time
+
+from fast_zero import security
+from fast_zero.cache import (
+    MemoryBackend,
+    TokenCache,
+    UserCache,
+    token_cache,
+    user_cache,
+)
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_expires_entries():
+    backend = MemoryBackend(maxsize=10)
+
+    with freeze_time('2024-01-01 12:00:00') as frozen:
+        await backend.set('key', {'id': 1}, ttl=60)
+        assert await backend.get('key') == {'id': 1}
+
+        frozen.tick(61)
+        assert await backend.get('key') is None
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(maxsize=2)
+
+    await backend.set('a', {'id': 1}, ttl=60)
+    await backend.set('b', {'id': 2}, ttl=60)
+    await backend.get('a')
+    await backend.set('c', {'id': 3}, ttl=60)
+
+    assert await backend.get('a') == {'id': 1}
+    assert await backend.get('b') is None
+    assert await backend.get('c') == {'id': 3}
+
+
+@pytest.mark.asyncio()
+async def test_user_cache_returns_user_attached_to_session(session, user):
+    cache = UserCache(MemoryBackend(maxsize=10), ttl=60)
+    await cache.set(user.email, user)
+    session.expunge(user)
+
+    cached = await cache.get(session, user.email)
+
+    assert cached.id == user.id
+    assert cached.email == user.email
+    assert cached in session
+    assert cache.stats() == {'hits': 1, 'misses': 0}
+
+
+@pytest.mark.asyncio()
+async def test_user_cache_disabled(session, user):
+    cache = UserCache(MemoryBackend(maxsize=10), ttl=0)
+    await cache.set(user.email, user)
+
+    assert await cache.get(session, user.email) is None
+    assert cache.stats() == {'hits': 0, 'misses': 0}
+
+
+def test_get_current_user_uses_cache(client, user, token):
+    hits = user_cache.hits
+
+    for _ in range(2):
+        response = client.post(
+            '/auth/refresh_token/',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    assert user_cache.hits == hits + 1
+    assert client.get('/stats/').json()['user_cache'] == user_cache.stats()
+
+
+def test_update_user_invalidates_cache(client, user, token):
+    client.post(
+        '/auth/refresh_token/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+    )
+    response = client.post(
+        '/auth/refresh_token/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_invalidates_cache(client, user, token):
+    client.post(
+        '/auth/refresh_token/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+    response = client.post(
+        '/auth/refresh_token/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_token_cache_returns_verified_claims():
+    cache = TokenCache(maxsize=10)
+    claims = {'sub': 'a@a.com', 'exp': 4_102_444_800}
+
+    cache.set('token', claims)
+
+    assert cache.get('token') == claims
+    assert cache.get('other') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+
+def test_token_cache_respects_exp():
+    cache = TokenCache(maxsize=10)
+
+    with freeze_time('2024-01-01 12:00:00') as frozen:
+        cache.set(
+            'token', {'sub': 'a@a.com', 'exp': frozen().timestamp() + 60}
+        )
+        assert cache.get('token')
+
+        frozen.tick(60)
+        assert cache.get('token') is None
+        assert len(cache) == 0
+
+
+def test_token_cache_skips_tokens_without_exp():
+    cache = TokenCache(maxsize=10)
+
+    cache.set('token', {'sub': 'a@a.com'})
+
+    assert cache.get('token') is None
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(maxsize=2)
+    for token in ('a', 'b'):
+        cache.set(token, {'exp': 4_102_444_800})
+
+    cache.get('a')
+    cache.set('c', {'exp': 4_102_444_800})
+
+    assert cache.get('b') is None
+    assert cache.get('a')
+    assert cache.get('c')
+
+
+def test_token_cache_disabled():
+    cache = TokenCache(maxsize=0)
+
+    cache.set('token', {'exp': 4_102_444_800})
+
+    assert cache.get('token') is None
+
+
+def test_decode_access_token_verifies_once(monkeypatch, user):
+    token = security.create_access_token({'sub': user.email})
+    calls = []
+    decode = security.decode
+    monkeypatch.setattr(
+        security,
+        'decode',
+        lambda *args, **kwargs: calls.append(1) or decode(*args, **kwargs),
+    )
+
+    first = security.decode_access_token(token)
+    second = security.decode_access_token(token)
+
+    assert first == second
+    assert len(calls) == 1
+    assert token_cache.stats()['size'] == 1
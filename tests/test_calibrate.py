@@ -0,0 +1,37 @@
+from fast_zero import calibrate
+
+
+def fake_verify_seconds(params, samples):
+    return params['time_cost'] * params['memory_cost'] / 1_000_000
+
+
+def test_calibrate_spends_budget_on_passes(monkeypatch):
+    target = 0.2
+    monkeypatch.setattr(calibrate, 'verify_seconds', fake_verify_seconds)
+
+    params, seconds = calibrate.calibrate(
+        target=target, memory_cost=65536, parallelism=4
+    )
+
+    assert params == {'time_cost': 3, 'memory_cost': 65536, 'parallelism': 4}
+    assert seconds <= target
+
+
+def test_calibrate_lowers_memory_when_one_pass_is_too_slow(monkeypatch):
+    monkeypatch.setattr(calibrate, 'verify_seconds', fake_verify_seconds)
+
+    params, _ = calibrate.calibrate(
+        target=0.02, memory_cost=65536, parallelism=4
+    )
+
+    assert params == {
+        'time_cost': 1,
+        'memory_cost': calibrate.MIN_MEMORY_COST,
+        'parallelism': 4,
+    }
+
+
+def test_verify_seconds_measures_real_hasher():
+    params = {'time_cost': 1, 'memory_cost': 8, 'parallelism': 1}
+
+    assert calibrate.verify_seconds(params, samples=1) > 0
@@ -1,14 +1,278 @@
-from sqlalchemy import select
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
 
-from fast_zero.models import User
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from fast_zero.database import pool_metrics, pool_options
+from fast_zero.models import (
+    Todo,
+    TodoState,
+    User,
+    active_users,
+    database_now,
+    table_registry,
+    user_todos,
+)
+from fast_zero.pagination import encode_cursor, paginate
+from fast_zero.routes.todos import search_todos
+from fast_zero.schemas import PageQuerySchema
+from fast_zero.settings import Settings
+from tests.conftest import TodoFactory
 
-def test_create_user(session):
+# The last row of a page before every seeded row.
+FIRST_PAGE_END = SimpleNamespace(created_at=datetime(2000, 1, 1), id=0)
+
+
+async def explain(session, query):
+    sql = query.compile(
+        dialect=session.bind.dialect, compile_kwargs={'literal_binds': True}
+    )
+    plan = await session.scalars(text(f'EXPLAIN {sql}'))
+    return '\n'.join(plan)
+
+
+async def seed_todos(session, user_id, count):
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, state, user_id) '
+            "SELECT 'title', 'description', "
+            "(ARRAY['draft', 'todo', 'doing', 'done', 'trash'])[n % 5 + 1]"
+            '::todostate, :user_id FROM generate_series(1, :count) AS n'
+        ),
+        {'user_id': user_id, 'count': count},
+    )
+
+
+@pytest.mark.asyncio()
+async def test_create_user(session):
     user = User(username='Bruno', password='senha123', email='bruno@email.com')
     session.add(user)
-    session.commit()
-    result = session.scalar(
+    await session.commit()
+    result = await session.scalar(
         select(User).where(User.email == 'bruno@email.com')
     )
 
     assert result.id == 1
+
+
+@pytest.mark.asyncio()
+async def test_read_todos_query_uses_user_index(session, user, other_user):
+    await seed_todos(session, user.id, 50)
+    await seed_todos(session, other_user.id, 20_000)
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+
+    query = select(Todo).where(user_todos(user.id)).order_by(Todo.id).limit(10)
+
+    assert 'ix_todos_user_id_id' in await explain(session, query)
+
+
+@pytest.mark.asyncio()
+async def test_read_todos_by_state_query_uses_state_index(
+    session, user, other_user
+):
+    await seed_todos(session, user.id, 50)
+    await seed_todos(session, other_user.id, 20_000)
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+
+    query = (
+        select(Todo)
+        .where(user_todos(user.id), Todo.state == TodoState.todo)
+        .order_by(Todo.id)
+        .limit(10)
+    )
+
+    assert 'ix_todos_user_id_state_id' in await explain(session, query)
+
+
+@pytest.mark.asyncio()
+async def test_todos_created_at_page_uses_created_at_index(
+    session, user, other_user
+):
+    await seed_todos(session, user.id, 20_000)
+    await seed_todos(session, other_user.id, 20_000)
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+    params = PageQuerySchema(
+        order_by='created_at',
+        cursor=encode_cursor('created_at', FIRST_PAGE_END),
+    )
+
+    query = paginate(select(Todo).where(user_todos(user.id)), Todo, params)
+
+    plan = await explain(session, query)
+    assert 'ix_todos_user_id_created_at_id' in plan
+    assert 'Sort' not in plan
+
+
+@pytest.mark.asyncio()
+async def test_users_created_at_page_uses_created_at_index(session):
+    await session.execute(
+        text(
+            'INSERT INTO users (username, email, password) '
+            "SELECT 'user' || n, 'user' || n || '@example.com', 'x' "
+            'FROM generate_series(1, 20000) AS n'
+        )
+    )
+    await session.commit()
+    await session.execute(text('ANALYZE users'))
+    params = PageQuerySchema(
+        order_by='created_at',
+        cursor=encode_cursor('created_at', FIRST_PAGE_END),
+    )
+
+    query = paginate(select(User).where(active_users()), User, params)
+
+    plan = await explain(session, query)
+    assert 'ix_users_created_at_id' in plan
+    assert 'Sort' not in plan
+
+
+@pytest.mark.asyncio()
+async def test_todo_search_query_uses_search_index(session, user):
+    await seed_todos(session, user.id, 20_000)
+    session.add_all(
+        TodoFactory.create_batch(5, user_id=user.id, title='find the needle')
+    )
+    await session.commit()
+    await session.execute(text('ANALYZE todos'))
+
+    query = (
+        select(Todo)
+        .where(user_todos(user.id), search_todos('needle', 'postgresql'))
+        .order_by(Todo.id)
+        .limit(10)
+    )
+
+    assert 'ix_todos_search' in await explain(session, query)
+
+
+@pytest.mark.asyncio()
+async def test_database_now_on_sqlite():
+    # The benchmarks run against SQLite by default.
+    sqlite = create_async_engine('sqlite+aiosqlite://')
+    async with sqlite.connect() as conn:
+        now = await conn.scalar(select(database_now()))
+    await sqlite.dispose()
+
+    assert isinstance(now, datetime)
+
+
+@pytest.mark.asyncio()
+async def test_created_at_pages_on_sqlite():
+    expected_todos = 3
+    sqlite = create_async_engine('sqlite+aiosqlite://')
+    async with sqlite.connect() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        async with AsyncSession(conn) as session:
+            user = User(username='user', email='user@test.com', password='x')
+            session.add(user)
+            await session.flush()
+            # Stamped within the same second.
+            session.add_all(
+                TodoFactory.create_batch(expected_todos, user_id=user.id)
+            )
+            await session.flush()
+            query = select(Todo).where(user_todos(user.id))
+            params = PageQuerySchema(order_by='created_at', limit=1)
+            first = await session.scalar(paginate(query, Todo, params))
+
+            params.cursor = encode_cursor('created_at', first)
+            params.limit = expected_todos
+            rest = await session.scalars(paginate(query, Todo, params))
+
+            assert len(rest.all()) == expected_todos - 1
+    await sqlite.dispose()
+
+
+def test_pool_options_from_settings():
+    settings = Settings(DATABASE_POOL_SIZE=20, DATABASE_MAX_OVERFLOW=5)
+
+    options = pool_options(settings)
+
+    assert options['pool_size'] == settings.DATABASE_POOL_SIZE
+    assert options['max_overflow'] == settings.DATABASE_MAX_OVERFLOW
+    assert options['pool_pre_ping'] is True
+
+
+def test_pool_options_split_connections_between_workers():
+    expected_pool_size = 10
+    settings = Settings(DATABASE_MAX_CONNECTIONS=40, SERVER_WORKERS=4)
+
+    options = pool_options(settings)
+
+    assert options['pool_size'] == expected_pool_size
+    assert options['max_overflow'] == 0
+
+
+def test_pool_options_keep_one_connection_per_worker():
+    settings = Settings(DATABASE_MAX_CONNECTIONS=2, SERVER_WORKERS=4)
+
+    assert pool_options(settings)['pool_size'] == 1
+
+
+def test_pool_options_null_pool_for_pgbouncer():
+    settings = Settings(
+        DATABASE_URL='postgresql+psycopg://app@pgbouncer/app',
+        DATABASE_POOL='null',
+    )
+
+    options = pool_options(settings)
+
+    assert issubclass(options['poolclass'], NullPool)
+    assert options['connect_args'] == {'prepare_threshold': None}
+    assert 'pool_size' not in options
+
+
+async def hammer(engine, concurrency):
+    async def query():
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT pg_sleep(0.01)'))
+
+    return await asyncio.gather(
+        *(query() for _ in range(concurrency)), return_exceptions=True
+    )
+
+
+@pytest.mark.asyncio()
+async def test_pool_has_no_checkout_timeouts_at_target_concurrency(engine):
+    concurrency = 200
+    settings = Settings(
+        DATABASE_POOL_SIZE=5, DATABASE_MAX_OVERFLOW=5, DATABASE_POOL_TIMEOUT=5
+    )
+    stressed = create_async_engine(engine.url, **pool_options(settings))
+    pool_metrics.reset()
+
+    errors = [error for error in await hammer(stressed, concurrency) if error]
+
+    stats = pool_metrics.stats(stressed.pool)
+    await stressed.dispose()
+    assert errors == []
+    assert stats['checkouts'] == concurrency
+    assert stats['timeouts'] == 0
+    assert stats['checked_out'] == 0
+    assert stats['wait_seconds_max'] < settings.DATABASE_POOL_TIMEOUT
+
+
+@pytest.mark.asyncio()
+async def test_pool_metrics_count_checkout_timeouts(engine):
+    settings = Settings(
+        DATABASE_POOL_SIZE=1,
+        DATABASE_MAX_OVERFLOW=0,
+        DATABASE_POOL_TIMEOUT=0.01,
+    )
+    starved = create_async_engine(engine.url, **pool_options(settings))
+    pool_metrics.reset()
+
+    results = await hammer(starved, 5)
+
+    await starved.dispose()
+    timeouts = [r for r in results if isinstance(r, PoolTimeoutError)]
+    assert timeouts
+    assert pool_metrics.timeouts == len(timeouts)
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from fast_zero.events import (
+    CHANNEL,
+    MAX_EVENT_BYTES,
+    Event,
+    EventBus,
+    reset_event,
+    todo_event,
+)
+
+USER_ID = 1
+
+
+def make_bus(replay_size=10, max_users=10, queue_size=10, heartbeat=5):
+    return EventBus(replay_size, max_users, queue_size, heartbeat)
+
+
+def event(id):
+    return Event(id, 'created', '{}')
+
+
+async def start(bus, last_event_id=None, version=0):
+    stream = bus.stream(USER_ID, last_event_id, version)
+    first = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)
+    return stream, first
+
+
+async def until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def test_todo_event_too_large_is_a_reset():
+    data = {'title': 'x' * MAX_EVENT_BYTES}
+
+    assert todo_event(1, 'created', data) == reset_event(1)
+
+
+@pytest.mark.asyncio()
+async def test_stream_skips_events_already_seen():
+    bus = make_bus()
+    stream, first = await start(bus, last_event_id=2, version=2)
+
+    bus.deliver(USER_ID, event(2))
+    bus.deliver(USER_ID, event(3))
+
+    assert await first == event(3).encode()
+    await stream.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_stream_resets_on_gap():
+    bus = make_bus()
+    stream, first = await start(bus)
+
+    bus.deliver(USER_ID, event(1))
+    bus.deliver(USER_ID, event(3))
+
+    assert await first == event(1).encode()
+    assert await anext(stream) == reset_event(3).encode()
+    await stream.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_stream_resets_on_overflow():
+    bus = make_bus(queue_size=1)
+    stream, first = await start(bus)
+
+    for id in range(1, 4):
+        bus.deliver(USER_ID, event(id))
+    assert await first == reset_event(3).encode()
+
+    bus.deliver(USER_ID, event(4))
+    assert await anext(stream) == event(4).encode()
+    await stream.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_stream_sends_heartbeats():
+    bus = make_bus(heartbeat=0.01)
+    stream, first = await start(bus)
+
+    assert await first == ': ping\n\n'
+    await stream.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_replay_history_kept_for_recent_users_only():
+    bus = make_bus(max_users=1)
+    with bus.subscribe(USER_ID):
+        bus.deliver(USER_ID, event(1))
+    with bus.subscribe(USER_ID + 1):
+        pass
+
+    assert bus.replay(USER_ID, 0, version=1) is None
+    assert not bus.subscribers
+
+
+@pytest.mark.asyncio()
+async def test_replay_missing_events():
+    bus = make_bus(replay_size=2)
+    with bus.subscribe(USER_ID):
+        for id in range(1, 4):
+            bus.deliver(USER_ID, event(id))
+
+    assert bus.replay(USER_ID, 1, version=3) == [event(2), event(3)]
+    assert bus.replay(USER_ID, 0, version=3) is None
+    assert bus.replay(USER_ID, 3, version=3) == []
+
+
+@pytest.mark.asyncio()
+async def test_publish_waits_for_the_commit(session):
+    bus = make_bus()
+    stream, first = await start(bus)
+
+    await bus.publish(session, USER_ID, event(1))
+    await asyncio.sleep(0.01)
+    assert not first.done()
+
+    await session.commit()
+    assert await first == event(1).encode()
+    await stream.aclose()
+
+
+@pytest.mark.asyncio()
+async def test_publish_dropped_on_rollback(session):
+    bus = make_bus()
+    await session.execute(select(1))
+
+    with bus.subscribe(USER_ID) as subscription:
+        await bus.publish(session, USER_ID, event(1))
+        await session.rollback()
+        await session.commit()
+
+        assert subscription.queue.empty()
+
+
+@pytest.mark.asyncio()
+async def test_listen_fans_out_through_postgres(session, engine):
+    bus = make_bus()
+    conninfo = engine.url.set(drivername='postgresql')
+    listener = asyncio.create_task(
+        bus.listen(conninfo.render_as_string(hide_password=False))
+    )
+    while not bus.fanout:
+        await asyncio.sleep(0.01)
+    stream, first = await start(bus)
+
+    await bus.publish(session, USER_ID, event(1))
+    await session.commit()
+
+    assert await asyncio.wait_for(first, 5) == event(1).encode()
+    await stream.aclose()
+    listener.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await listener
+    assert not bus.fanout
+
+
+@pytest.mark.asyncio()
+async def test_listen_survives_a_bad_notification(session, engine, caplog):
+    bus = make_bus()
+    conninfo = engine.url.set(drivername='postgresql')
+    listener = asyncio.create_task(
+        bus.listen(conninfo.render_as_string(hide_password=False), 0.01)
+    )
+    while not bus.fanout:
+        await asyncio.sleep(0.01)
+
+    await session.execute(select(func.pg_notify(CHANNEL, 'not json')))
+    await session.commit()
+    await asyncio.wait_for(until(lambda: 'Lost the' in caplog.text), 5)
+    await asyncio.wait_for(until(lambda: bus.fanout), 5)
+    stream, first = await start(bus)
+    await bus.publish(session, USER_ID, event(1))
+    await session.commit()
+
+    assert await asyncio.wait_for(first, 5) == event(1).encode()
+    await stream.aclose()
+    listener.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await listener
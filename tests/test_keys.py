@@ -0,0 +1,136 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from fastapi import HTTPException
+from jwt import PyJWK, decode, get_unverified_header
+
+from fast_zero import app, security
+from fast_zero.cache import token_cache
+from fast_zero.keys import KeySet
+
+
+def pem(private_key):
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+@pytest.fixture(scope='module')
+def pems():
+    return {
+        'rsa-1': pem(rsa.generate_private_key(65537, 2048)),
+        'ed-1': pem(ed25519.Ed25519PrivateKey.generate()),
+        'ec-1': pem(ec.generate_private_key(ec.SECP256R1())),
+    }
+
+
+@pytest.fixture()
+def use_keys(monkeypatch, pems):
+    def use_keys(active_kid, keys=pems):
+        key_set = KeySet(keys, active_kid)
+        monkeypatch.setattr(security, 'key_set', key_set)
+        monkeypatch.setattr(app, 'key_set', key_set)
+        # Keys only change on restart, which also empties the cache.
+        token_cache.clear()
+
+    return use_keys
+
+
+def test_key_set_algorithms(pems):
+    key_set = KeySet(pems, 'rsa-1')
+
+    assert {kid: key.algorithm for kid, key in key_set.keys.items()} == {
+        'rsa-1': 'RS256',
+        'ed-1': 'EdDSA',
+        'ec-1': 'ES256',
+    }
+
+
+def test_key_set_single_key_is_active(pems):
+    key_set = KeySet({'ed-1': pems['ed-1']})
+
+    assert key_set.active.kid == 'ed-1'
+
+
+def test_key_set_requires_active_kid(pems):
+    with pytest.raises(ValueError, match='JWT_ACTIVE_KID'):
+        KeySet(pems)
+
+
+def test_key_set_without_keys_is_disabled():
+    assert not KeySet({}).enabled
+
+
+@pytest.mark.parametrize('kid', ['rsa-1', 'ed-1', 'ec-1'])
+def test_create_access_token_signs_with_active_key(use_keys, pems, kid):
+    use_keys(kid)
+
+    token = security.create_access_token({'sub': 'a@a.com'})
+
+    header = get_unverified_header(token)
+    assert header['kid'] == kid
+    assert security.decode_access_token(token)['sub'] == 'a@a.com'
+
+
+def test_tokens_verify_with_published_jwk(use_keys):
+    use_keys('ed-1')
+    token = security.create_access_token({'sub': 'a@a.com'})
+
+    jwks = json.loads(security.key_set.jwks)
+    (jwk,) = [key for key in jwks['keys'] if key['kid'] == 'ed-1']
+    claims = decode(token, PyJWK(jwk).key, algorithms=[jwk['alg']])
+
+    assert claims['sub'] == 'a@a.com'
+
+
+def test_old_key_still_verifies_after_rotation(use_keys):
+    use_keys('rsa-1')
+    token = security.create_access_token({'sub': 'a@a.com'})
+
+    use_keys('ed-1')
+
+    assert security.decode_access_token(token)['sub'] == 'a@a.com'
+
+
+def test_unknown_kid_is_rejected(use_keys, pems):
+    use_keys('rsa-1')
+    token = security.create_access_token({'sub': 'a@a.com'})
+
+    use_keys('ed-1', {'ed-1': pems['ed-1']})
+
+    with pytest.raises(HTTPException):
+        security.decode_access_token(token)
+
+
+def test_hmac_token_is_rejected_with_keys(use_keys):
+    token = security.create_access_token({'sub': 'a@a.com'})
+    use_keys('rsa-1')
+
+    with pytest.raises(HTTPException):
+        security.decode_access_token(token)
+
+
+def test_jwks_endpoint(client, use_keys):
+    use_keys('rsa-1')
+
+    response = client.get('/.well-known/jwks.json')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['cache-control'].startswith('public, max-age=')
+    assert sorted(key['kid'] for key in response.json()['keys']) == [
+        'ec-1',
+        'ed-1',
+        'rsa-1',
+    ]
+    assert all(key['use'] == 'sig' for key in response.json()['keys'])
+
+
+def test_jwks_endpoint_without_keys(client):
+    response = client.get('/.well-known/jwks.json')
+
+    assert response.json() == {'keys': []}
@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from fast_zero.metrics import instrument_engine, sql_operation
+from fast_zero.security import get_password_hash_async
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture(scope='module')
+def instrumented_engine(engine):
+    instrument_engine(engine)
+    return engine
+
+
+def test_metrics_endpoint(client):
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'http_requests_in_progress' in response.text
+    assert 'db_pool_checkouts_total' in response.text
+
+
+def test_request_latency_by_route_template(client, token, todo):
+    labels = {'method': 'GET', 'route': '/todos/', 'status': '200'}
+    before = sample('http_request_duration_seconds_count', **labels)
+
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    assert sample('http_request_duration_seconds_count', **labels) == (
+        before + 1
+    )
+
+
+def test_unmatched_routes_share_one_label(client):
+    labels = {'method': 'GET', 'route': '<unmatched>', 'status': '404'}
+    before = sample('http_request_duration_seconds_count', **labels)
+
+    client.get('/does-not-exist')
+    client.get('/does-not-exist-either')
+
+    assert sample('http_request_duration_seconds_count', **labels) == (
+        before + 2
+    )
+
+
+def test_sql_statements_are_attributed_to_the_route(
+    instrumented_engine, client, token
+):
+    labels = {'route': '/todos/', 'operation': 'SELECT'}
+    before = sample('db_statement_duration_seconds_count', **labels)
+
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    assert sample('db_statement_duration_seconds_count', **labels) > before
+
+
+@pytest.mark.asyncio()
+async def test_sql_statements_outside_requests(engine):
+    instrumented = create_async_engine(engine.url)
+    instrument_engine(instrumented)
+    before = sample(
+        'db_statement_duration_seconds_count', route='', operation='SELECT'
+    )
+
+    async with instrumented.connect() as conn:
+        await conn.execute(text('SELECT 1'))
+    await instrumented.dispose()
+
+    assert sample(
+        'db_statement_duration_seconds_count', route='', operation='SELECT'
+    ) == (before + 1)
+
+
+@pytest.mark.parametrize(
+    ('statement', 'operation'),
+    [
+        ('SELECT 1', 'SELECT'),
+        ('\n  insert into todos ...', 'INSERT'),
+        ('WITH x AS (SELECT 1) SELECT * FROM x', 'OTHER'),
+    ],
+)
+def test_sql_operation(statement, operation):
+    assert sql_operation(statement) == operation
+
+
+@pytest.mark.asyncio()
+async def test_password_hash_is_timed():
+    labels = {'route': '', 'operation': 'get_password_hash'}
+    before = sample('password_hash_duration_seconds_count', **labels)
+
+    await get_password_hash_async('secret')
+
+    assert sample('password_hash_duration_seconds_count', **labels) == (
+        before + 1
+    )
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from fast_zero import purge
+from fast_zero.models import (
+    AccountDeletion,
+    RefreshToken,
+    Todo,
+    TodoTombstone,
+    TokenRevocation,
+    User,
+)
+from fast_zero.purge import (
+    delete_account_batch,
+    purge_batch,
+    purge_step,
+    run_purge,
+)
+from fast_zero.security import issue_refresh_token, utcnow
+from tests.conftest import TodoFactory
+
+
+def deleted_todos(user_id, count, ago):
+    todos = TodoFactory.create_batch(count, user_id=user_id)
+    for todo in todos:
+        todo.deleted_at = utcnow() - ago
+    return todos
+
+
+async def count(session, model):
+    return await session.scalar(select(func.count()).select_from(model))
+
+
+async def stop(task):
+    # psycopg's waits can swallow a cancel that lands as a query finishes
+    # (asyncio.wait_for before Python 3.12), so repeat it until it sticks.
+    while not task.done():
+        task.cancel()
+        await asyncio.wait({task}, timeout=0.1)
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio()
+async def test_purge_step_removes_old_rows_only(session, user):
+    old = deleted_todos(user.id, 1, timedelta(days=2))[0]
+    recent = deleted_todos(user.id, 1, timedelta(minutes=1))[0]
+    live = TodoFactory(user_id=user.id)
+    session.add_all([old, recent, live])
+    await session.commit()
+    tombstones = [
+        TodoTombstone(todo_id=old.id, user_id=user.id),
+        TodoTombstone(todo_id=recent.id, user_id=user.id),
+    ]
+    session.add_all(tombstones)
+    await session.flush()
+    tombstones[0].deleted_at = utcnow() - timedelta(days=31)
+    await session.commit()
+
+    assert await purge_step(session, 10) == (1, 1, 0, 0, 0)
+
+    remaining = await session.scalars(select(Todo.id).order_by(Todo.id))
+    assert list(remaining) == [recent.id, live.id]
+    tombstone = await session.scalar(select(TodoTombstone.todo_id))
+    assert tombstone == recent.id
+
+
+@pytest.mark.asyncio()
+async def test_purge_step_removes_expired_refresh_tokens(session, user):
+    issue_refresh_token(session, user.id)
+    issue_refresh_token(session, user.id)
+    await session.flush()
+    expired = await session.scalar(select(RefreshToken).limit(1))
+    expired.expires_at = utcnow() - timedelta(minutes=1)
+    await session.commit()
+
+    assert await purge_step(session, 10) == (0, 0, 1, 0, 0)
+
+    remaining = await session.scalars(select(RefreshToken.id))
+    assert expired.id not in remaining.all()
+    assert await count(session, RefreshToken) == 1
+
+
+@pytest.mark.asyncio()
+async def test_purge_step_removes_old_token_revocations(
+    session, user, other_user
+):
+    old = TokenRevocation(user_id=user.id, version=1)
+    session.add_all([old, TokenRevocation(user_id=other_user.id, version=1)])
+    await session.flush()
+    old.revoked_at = utcnow() - timedelta(days=1)
+    await session.commit()
+
+    assert await purge_step(session, 10) == (0, 0, 0, 1, 0)
+
+    remaining = await session.scalars(select(TokenRevocation.user_id))
+    assert remaining.all() == [other_user.id]
+
+
+@pytest.mark.asyncio()
+async def test_purge_batch_deletes_at_most_size(session, user):
+    session.add_all(deleted_todos(user.id, 5, timedelta(days=2)))
+    await session.commit()
+    size = 2
+
+    removed = await purge_batch(
+        session, Todo.id, Todo.deleted_at, utcnow(), size
+    )
+
+    assert removed == size
+    assert await count(session, Todo) == 5 - size
+
+
+@pytest.mark.asyncio()
+async def test_run_purge_is_rate_limited(session, engine, user):
+    session.add_all(deleted_todos(user.id, 6, timedelta(days=2)))
+    await session.commit()
+    # 3 batches of 2 rows at 20 rows per second take at least 0.2s.
+    min_seconds = 0.2
+
+    start = time.monotonic()
+    purge = asyncio.create_task(run_purge(engine, 2, 20, idle_seconds=60))
+    while await count(session, Todo):
+        await asyncio.sleep(0.01)
+    elapsed = time.monotonic() - start
+    await stop(purge)
+
+    assert elapsed >= min_seconds
+
+
+@pytest.mark.asyncio()
+async def test_run_purge_survives_errors(monkeypatch, caplog, engine):
+    steps = []
+    attempts = 2
+
+    async def flaky_step(session, size):
+        steps.append(size)
+        if len(steps) == 1:
+            raise OperationalError('DELETE', {}, Exception('server closed'))
+        return 0, 0, 0, 0, 0
+
+    monkeypatch.setattr(purge, 'purge_step', flaky_step)
+    task = asyncio.create_task(run_purge(engine, 2, 20, idle_seconds=0.01))
+    while len(steps) < attempts:
+        await asyncio.sleep(0.01)
+    await stop(task)
+
+    assert 'Purge failed' in caplog.text
+
+
+@pytest.mark.asyncio()
+async def test_deleted_todos_wait_for_the_purge(session, client, token, user):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+    client.delete(
+        f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert await purge_step(session, 10) == (0, 0, 0, 0, 0)
+    assert await count(session, Todo) == 1
+
+
+@pytest.mark.asyncio()
+async def test_delete_account_in_batches(
+    session, client, token, user, other_user
+):
+    # Soft-deleted todos go too.
+    total = 5
+    session.add_all(TodoFactory.create_batch(total - 1, user_id=user.id))
+    session.add_all(deleted_todos(user.id, 1, timedelta(minutes=1)))
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+    size = 2
+
+    assert [await delete_account_batch(session, size) for _ in range(4)] == [
+        2,
+        2,
+        1,
+        0,
+    ]
+
+    deletion = await session.get(AccountDeletion, user.id)
+    await session.refresh(deletion)
+    assert deletion.todos_deleted == total
+    assert deletion.finished_at is not None
+    assert await count(session, User) == 1
+    assert await count(session, Todo) == 1
@@ -0,0 +1,252 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from fast_zero.app import app
+from fast_zero.database import get_session
+from fast_zero.ratelimit import (
+    ConcurrencyLimit,
+    MemoryRateLimitBackend,
+    RateLimiter,
+    login_verifications,
+)
+from fast_zero.security import (
+    create_access_token,
+    get_password_hash,
+    password_hasher,
+)
+from fast_zero.settings import Settings
+from tests.conftest import UserFactory
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_allows_burst_then_waits():
+    backend = MemoryRateLimitBackend(maxsize=10)
+    burst = 3
+
+    results = [await backend.take('key', 1, burst) for _ in range(burst + 1)]
+
+    assert results[:burst] == [0, 0, 0]
+    assert 0 < results[burst] <= 1
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_refills(monkeypatch):
+    backend = MemoryRateLimitBackend(maxsize=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+    await backend.take('key', 1, 1)
+
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 1)
+
+    assert await backend.take('key', 1, 1) == 0
+
+
+@pytest.mark.asyncio()
+async def test_memory_backend_is_bounded():
+    backend = MemoryRateLimitBackend(maxsize=2)
+
+    for key in ('a', 'b', 'c'):
+        await backend.take(key, 1, 1)
+
+    assert len(backend) == backend.maxsize
+
+
+@pytest.mark.asyncio()
+async def test_rate_limiter_rejects_with_retry_after():
+    limiter = RateLimiter(MemoryRateLimitBackend(maxsize=10))
+    await limiter.check('key', per_minute=1, burst=1)
+
+    with pytest.raises(HTTPException) as exc:
+        await limiter.check('key', per_minute=1, burst=1)
+
+    assert exc.value.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert exc.value.headers == {'Retry-After': '60'}
+    assert limiter.stats() == {'rejected': 1}
+
+
+@pytest.mark.asyncio()
+async def test_rate_limiter_disabled_with_zero_rate():
+    limiter = RateLimiter(MemoryRateLimitBackend(maxsize=10))
+
+    for _ in range(10):
+        await limiter.check('key', per_minute=0, burst=0)
+
+
+@pytest.mark.asyncio()
+async def test_concurrency_limit_queues_for_a_slot():
+    limit = ConcurrencyLimit(1, timeout=5)
+    entered = asyncio.Event()
+
+    async def enter():
+        async with limit:
+            entered.set()
+
+    async with limit:
+        waiting = asyncio.create_task(enter())
+        await asyncio.sleep(0)
+        assert limit.stats()['waiting'] == 1
+        assert not entered.is_set()
+
+    await waiting
+    assert entered.is_set()
+    assert limit.stats() == {
+        'limit': 1,
+        'active': 0,
+        'waiting': 0,
+        'rejected': 0,
+    }
+
+
+@pytest.mark.asyncio()
+async def test_concurrency_limit_rejects_after_timeout():
+    limit = ConcurrencyLimit(1, timeout=0.01)
+
+    async with limit:
+        with pytest.raises(HTTPException) as exc:
+            async with limit:
+                pass
+
+    assert exc.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert exc.value.headers == {'Retry-After': '1'}
+    assert limit.stats()['active'] == 0
+    assert limit.stats()['waiting'] == 0
+
+
+def test_login_limited_by_username(client, user):
+    responses = [
+        client.post(
+            '/auth/token/',
+            data={'username': user.email, 'password': 'wrong'},
+        )
+        for _ in range(6)
+    ]
+
+    assert responses[-2].status_code == HTTPStatus.BAD_REQUEST
+    assert responses[-1].status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(responses[-1].headers['retry-after']) > 0
+
+
+def test_auth_routes_limited_by_ip(client):
+    responses = [
+        client.post('/auth/token/refresh/', json={'refresh_token': 'invalid'})
+        for _ in range(21)
+    ]
+
+    assert responses[-2].status_code == HTTPStatus.UNAUTHORIZED
+    assert responses[-1].status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+
+@pytest_asyncio.fixture()
+async def proxy_client(session):
+    app.dependency_overrides[get_session] = lambda: session
+    # The app as uvicorn serves it behind a trusted proxy.
+    transport = httpx.ASGITransport(
+        app=ProxyHeadersMiddleware(
+            app, trusted_hosts=Settings().SERVER_FORWARDED_ALLOW_IPS
+        ),
+        client=('127.0.0.1', 8000),
+    )
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://test'
+    ) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio()
+async def test_auth_routes_limited_by_forwarded_ip(proxy_client):
+    async def refresh(ip):
+        return await proxy_client.post(
+            '/auth/token/refresh/',
+            json={'refresh_token': 'invalid'},
+            headers={'X-Forwarded-For': ip},
+        )
+
+    responses = [await refresh('203.0.113.1') for _ in range(21)]
+    other = await refresh('203.0.113.2')
+
+    assert responses[-1].status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert other.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_logins_wait_for_a_slot(
+    monkeypatch, session, async_client
+):
+    logins = 3
+    users = UserFactory.create_batch(logins)
+    passwords = [user.password for user in users]
+    for user in users:
+        user.password = get_password_hash(user.password)
+    session.add_all(users)
+    await session.commit()
+    monkeypatch.setattr(login_verifications, 'limit', 1)
+
+    responses = await asyncio.gather(
+        *(
+            async_client.post(
+                '/auth/token/',
+                data={'username': user.email, 'password': password},
+            )
+            for user, password in zip(users, passwords)
+        )
+    )
+
+    assert [response.status_code for response in responses] == [
+        HTTPStatus.OK
+    ] * logins
+    assert login_verifications.active == 0
+
+
+@pytest.mark.asyncio()
+async def test_todos_stay_responsive_during_login_flood(
+    session, user, todo, async_client
+):
+    logins = 100
+    # Credential stuffing: many real accounts, so every login that gets
+    # through the buckets runs Argon2.
+    users = UserFactory.create_batch(logins // 5, password=user.password)
+    session.add_all(users)
+    await session.commit()
+    headers = {
+        'Authorization': f'Bearer {create_access_token({"sub": user.email})}'
+    }
+
+    async def login(number):
+        return await async_client.post(
+            '/auth/token/',
+            data={
+                'username': users[number % len(users)].email,
+                'password': 'wrong',
+            },
+        )
+
+    async def read_todos():
+        # Verifications waiting for a slot never reach the hasher pool.
+        pending = password_hasher.pending
+        response = await async_client.get('/todos/', headers=headers)
+        return response.status_code, pending
+
+    results = await asyncio.gather(
+        *(login(number) for number in range(logins)),
+        *(read_todos() for _ in range(10)),
+    )
+
+    statuses = [response.status_code for response in results[:logins]]
+    reads = results[logins:]
+    assert statuses.count(HTTPStatus.TOO_MANY_REQUESTS) > logins // 2
+    assert set(statuses) <= {
+        HTTPStatus.BAD_REQUEST,
+        HTTPStatus.TOO_MANY_REQUESTS,
+    }
+    assert all(status == HTTPStatus.OK for status, _ in reads)
+    assert max(pending for _, pending in reads) <= login_verifications.limit
+    assert login_verifications.active == 0
+    assert password_hasher.pending == 0
@@ -3,11 +3,27 @@ from http import HTTPStatus
 import pytest
 from fastapi import HTTPException
 from jwt import decode
+from sqlalchemy import event
 
+from fast_zero import security
+from fast_zero.cache import (
+    MemoryBackend,
+    TokenDenylist,
+    UserCache,
+    token_denylist,
+)
+from fast_zero.models import TokenRevocation
 from fast_zero.security import (
+    PasswordHasher,
+    TokenUser,
     create_access_token,
+    get_current_principal,
     get_current_user,
+    get_password_hash,
+    get_password_hash_async,
     settings,
+    verify_password,
+    verify_password_async,
 )
 
 
@@ -23,31 +39,35 @@ def test_create_access_token():
     assert result['exp']
 
 
-def test_get_current_user(session, token, user):
-    result = get_current_user(session=session, token=token)
+@pytest.mark.asyncio()
+async def test_get_current_user(session, token, user):
+    result = await get_current_user(session=session, token=token)
 
     assert result.id == user.id
 
 
-def test_get_current_user__invalid_token(session):
+@pytest.mark.asyncio()
+async def test_get_current_user__invalid_token(session):
     token = 'invalid_token'
 
     with pytest.raises(HTTPException):
-        get_current_user(session=session, token=token)
+        await get_current_user(session=session, token=token)
 
 
-def test_get_current_user__without_sub(session):
+@pytest.mark.asyncio()
+async def test_get_current_user__without_sub(session):
     access_token = create_access_token({'sub': ''})
 
     with pytest.raises(HTTPException):
-        get_current_user(session=session, token=access_token)
+        await get_current_user(session=session, token=access_token)
 
 
-def test_get_current_user__without_email(session):
+@pytest.mark.asyncio()
+async def test_get_current_user__without_email(session):
     access_token = create_access_token({'sub': 'fake@email.com'})
 
     with pytest.raises(HTTPException):
-        get_current_user(session=session, token=access_token)
+        await get_current_user(session=session, token=access_token)
 
 
 def test_jwt__invalid_token(client, user):
@@ -82,3 +102,200 @@ def test_jwt__without_email(client, user):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio()
+async def test_password_hash_async():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio()
+async def test_password_hasher__process_pool():
+    hasher = PasswordHasher(kind='process', workers=1, max_pending=1)
+
+    hashed = await hasher.run(get_password_hash, 'secret')
+    hasher.shutdown()
+
+    assert verify_password('secret', hashed)
+
+
+@pytest.mark.asyncio()
+async def test_password_hasher__rejects_when_full():
+    hasher = PasswordHasher(kind='thread', workers=1, max_pending=0)
+
+    with pytest.raises(HTTPException) as exc:
+        await hasher.run(get_password_hash, 'secret')
+
+    assert exc.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert exc.value.headers == {'Retry-After': '1'}
+
+
+@pytest.fixture()
+def _stateless(monkeypatch):
+    monkeypatch.setattr(settings, 'AUTH_STATELESS', True)
+
+
+@pytest.fixture()
+def statements(session):
+    executed = []
+
+    def capture(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    engine = session.bind.sync_engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', capture)
+
+
+def test_create_access_token_with_user(user):
+    token = create_access_token({'sub': user.email}, user)
+
+    result = decode(
+        token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+
+    assert result['uid'] == user.id
+    assert result['ver'] == user.token_version
+
+
+@pytest.mark.asyncio()
+async def test_get_current_user__old_token_version(session, user):
+    access_token = create_access_token({'sub': user.email}, user)
+    user.token_version += 1
+    await session.commit()
+
+    with pytest.raises(HTTPException):
+        await get_current_user(session=session, token=access_token)
+
+
+@pytest.mark.asyncio()
+async def test_get_current_user__revoked_by_other_worker(
+    monkeypatch, session, client, token, user
+):
+    # A second worker's caches: deleting the account only invalidates the
+    # first worker's.
+    monkeypatch.setattr(
+        security, 'user_cache', UserCache(MemoryBackend(10), 60)
+    )
+    # Reloaded on every check, as after TOKEN_DENYLIST_REFRESH_SECONDS.
+    monkeypatch.setattr(security, 'token_denylist', TokenDenylist(0))
+    await get_current_user(session=session, token=token)
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    with pytest.raises(HTTPException):
+        await get_current_user(session=session, token=token)
+
+
+@pytest.mark.asyncio()
+async def test_get_current_user__newer_token_reloads_cached_user(
+    session, user
+):
+    await get_current_user(
+        session=session, token=create_access_token({'sub': user.email}, user)
+    )
+    user.token_version += 1
+    await session.commit()
+
+    result = await get_current_user(
+        session=session, token=create_access_token({'sub': user.email}, user)
+    )
+
+    assert result.token_version == user.token_version
+
+
+@pytest.mark.asyncio()
+async def test_get_current_principal__stateful(session, token, user):
+    result = await get_current_principal(session=session, token=token)
+
+    assert result is await get_current_user(session=session, token=token)
+
+
+@pytest.mark.usefixtures('_stateless')
+@pytest.mark.asyncio()
+async def test_get_current_principal__stateless_skips_user_lookup(
+    session, statements, token, user
+):
+    await get_current_principal(session=session, token=token)
+    statements.clear()
+
+    result = await get_current_principal(session=session, token=token)
+
+    assert result == TokenUser(id=user.id, email=user.email)
+    assert statements == []
+
+
+@pytest.mark.usefixtures('_stateless')
+@pytest.mark.asyncio()
+async def test_get_current_principal__stateless_without_uid(session, user):
+    access_token = create_access_token({'sub': user.email})
+
+    result = await get_current_principal(session=session, token=access_token)
+
+    assert result.id == user.id
+    assert not isinstance(result, TokenUser)
+
+
+@pytest.mark.usefixtures('_stateless')
+@pytest.mark.asyncio()
+async def test_get_current_principal__revoked_by_other_worker(
+    session, token, user
+):
+    await get_current_principal(session=session, token=token)
+    session.add(TokenRevocation(user_id=user.id, version=1))
+    await session.commit()
+
+    token_denylist.loaded_at = float('-inf')
+
+    with pytest.raises(HTTPException):
+        await get_current_principal(session=session, token=token)
+
+
+@pytest.mark.asyncio()
+async def test_token_denylist_revoke_waits_for_commit(session, user):
+    denylist = TokenDenylist(3600)
+    await denylist.refresh(session)
+    user_id = user.id
+
+    await denylist.revoke(session, user_id, 1)
+    assert not await denylist.is_revoked(session, user_id, 0)
+    await session.rollback()
+    assert not await denylist.is_revoked(session, user_id, 0)
+
+    await denylist.revoke(session, user_id, 1)
+    await session.commit()
+    assert await denylist.is_revoked(session, user_id, 0)
+
+
+@pytest.mark.usefixtures('_stateless')
+def test_stateless__update_user_revokes_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+    )
+
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.usefixtures('_stateless')
+def test_stateless__delete_user_revokes_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
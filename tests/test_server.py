@@ -0,0 +1,46 @@
+import os
+
+from fast_zero import server
+from fast_zero.settings import Settings
+
+
+def test_worker_count_defaults_to_available_cpus(monkeypatch):
+    cpus = 8
+    monkeypatch.setattr(server, 'available_cpus', lambda: cpus)
+
+    assert server.worker_count(Settings(SERVER_WORKERS=0)) == cpus
+
+
+def test_worker_count_from_settings(monkeypatch):
+    workers = 3
+    monkeypatch.setattr(server, 'available_cpus', lambda: 8)
+
+    assert server.worker_count(Settings(SERVER_WORKERS=workers)) == workers
+
+
+def test_main_runs_uvicorn_with_resolved_workers(monkeypatch):
+    cpus = 4
+    calls = []
+    monkeypatch.setenv('SERVER_WORKERS', '0')
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', '/tmp/metrics')
+    monkeypatch.setattr(server, 'available_cpus', lambda: cpus)
+    monkeypatch.setattr(
+        server.uvicorn, 'run', lambda app, **kwargs: calls.append(kwargs)
+    )
+
+    server.main()
+
+    (kwargs,) = calls
+    assert kwargs['workers'] == cpus
+    assert kwargs['forwarded_allow_ips'] == '127.0.0.1'
+    assert os.environ['SERVER_WORKERS'] == str(cpus)
+
+
+def test_main_shares_metrics_between_workers(monkeypatch):
+    monkeypatch.setenv('SERVER_WORKERS', '2')
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+    monkeypatch.setattr(server.uvicorn, 'run', lambda app, **kwargs: None)
+
+    server.main()
+
+    assert os.path.isdir(os.environ.pop('PROMETHEUS_MULTIPROC_DIR'))